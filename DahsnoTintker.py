@@ -1,132 +1,102 @@
 import pandas as pd
 import streamlit as st
-import re
 import os
-import chardet
 from datetime import datetime
+from case_categorizer import DIT_TEAM, enrich_cases
+from case_filters import STATUS_OPTIONS, CaseFilterIndex
+from case_loader import DAY_COLUMN, file_content_hash, files_content_hash, load_case_files, load_cases
+from case_rollup import ReferenceRollup
+from case_search import CaseSearchIndex
 
 st.set_page_config(layout="wide", page_title="GPSSA Case Dashboard", page_icon="📊")
 
-# Detect encoding
-def detect_encoding(file):
-    raw = file.read()
-    result = chardet.detect(raw)
-    file.seek(0)
-    return result['encoding']
-
-# Load CSV data
-@st.cache_data
-def load_data(uploaded_file):
-    if uploaded_file is None:
+# Users grouped under DIT-Team
+TARGET_USERS = ['anas.hasan', 'ali.babiker', 'mohammed.reda']
+
+# Versions of the data kept loaded, older uploads are dropped from the shared caches
+CACHED_FILES = 4
+
+# Load CSV data, the encoding is detected from a sample of the file
+def load_data(source):
+    if source is None:
         return None
+    return load_cases(source)
 
-    try:
-        encoding = detect_encoding(uploaded_file)
-        df = pd.read_csv(uploaded_file, encoding=encoding)
-    except:
-        fallback_encodings = ['utf-8-sig', 'windows-1256', 'iso-8859-6', 'cp1256', 'utf-8']
-        for enc in fallback_encodings:
-            try:
-                uploaded_file.seek(0)
-                df = pd.read_csv(uploaded_file, encoding=enc)
-                break
-            except:
-                continue
-        else:
-            return None
-
-    for col in ['Case Start Date', 'Last Note Date']:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], format='%d/%m/%Y', errors='coerce')
-    df = df.dropna(subset=['Case Start Date'])
-    df = df.fillna('')
-    if 'Last Note' in df.columns:
-        df['Last Note'] = df['Last Note'].astype(str).apply(lambda x: x.encode('raw_unicode_escape').decode('utf-8', errors='replace'))
-
-    return df
-
-def categorize_case(note):
-    if pd.isna(note) or str(note).strip() == '':
-        return 'Not Triaged'
-
-    note = str(note).lower()
-    patterns = [
-        (r'(sr|service request|اس ار|طلب خدمة)\s*[:#]?\s*(\d{4,5})', 'SR'),
-        (r'(inc|incident|انسدنت|حالة)\s*[:#]?\s*(\d{4,5})', 'Incident'),
-        (r'\b(1[45]\d{3})\b', 'SR'),
-        (r'\b(2[12]\d{3})\b', 'Incident'),
-        (r'(tkt|ticket|تيكت)\s*[_:]?\s*(\d{4,5})', 'Incident')
-    ]
-    for pattern, prefix in patterns:
-        matches = re.finditer(pattern, note)
-        for match in matches:
-            number = match.group(2) if len(match.groups()) > 1 else match.group(1)
-            if prefix == 'SR' and number.startswith(('14', '15')):
-                return f'Pending SR {number}'
-            elif prefix == 'Incident' and number.startswith(('21', '22')):
-                return f'Pending Incident {number}'
-            elif prefix == 'Incident':
-                return f'Pending Incident {number}'
-
-    return 'Not Triaged'
+# Load and enrich once per file content and process, every session reads the same frame
+@st.cache_resource(max_entries=CACHED_FILES)
+def load_enriched_data(file_hash, _file):
+    df = load_data(_file)
+    if df is None:
+        return None
+    return enrich_cases(df, TARGET_USERS)
+
+# Load several exports in a process pool and merge them, once per combined file content
+@st.cache_resource(max_entries=CACHED_FILES)
+def load_enriched_files(file_hash, _files):
+    df = load_case_files(_files)
+    if df is None:
+        return None
+    return enrich_cases(df, TARGET_USERS)
+
+# Filter index over the loaded data, built once per file content and shared read-only
+@st.cache_resource(max_entries=CACHED_FILES)
+def build_filter_index(file_hash, _df):
+    return CaseFilterIndex(_df, TARGET_USERS)
+
+# SR/Incident rollup of the loaded data, built once per file content and shared read-only
+@st.cache_resource(max_entries=CACHED_FILES)
+def build_reference_rollup(file_hash, _df):
+    return ReferenceRollup(_df)
+
+# Search index over the loaded data, built once per file content and shared read-only
+@st.cache_resource(max_entries=CACHED_FILES)
+def build_search_index(file_hash, _df):
+    return CaseSearchIndex(_df, ['Case Id', 'Status', 'Last Note'])
 
 def main():
     st.title("📊 GPSSA Case Management Dashboard")
 
     st.sidebar.header("📂 Upload or Use Default CSV")
-    uploaded_file = st.sidebar.file_uploader("Upload CSV file", type="csv")
+    uploaded_files = st.sidebar.file_uploader("Upload CSV files", type="csv", accept_multiple_files=True)
 
-    if uploaded_file:
-        file_to_load = uploaded_file
+    if len(uploaded_files) > 1:
+        file_to_load = uploaded_files
+        st.sidebar.success(f"{len(uploaded_files)} custom files uploaded, merged by Case Id.")
+    elif uploaded_files:
+        file_to_load = uploaded_files[0]
         st.sidebar.success("Custom file uploaded.")
     else:
         default_path = r"C:\Users\Admin\Desktop\Gpssa\20April.csv"
         if os.path.exists(default_path):
-            file_to_load = open(default_path, 'rb')
+            file_to_load = default_path
             st.sidebar.info("Using default file.")
         else:
             file_to_load = None
             st.sidebar.warning("Default file not found. Please upload a file.")
 
-    df = load_data(file_to_load)
+    if isinstance(file_to_load, list):
+        file_hash = files_content_hash(file_to_load)
+        df = load_enriched_files(file_hash, file_to_load)
+    else:
+        file_hash = file_content_hash(file_to_load) if file_to_load else None
+        df = load_enriched_data(file_hash, file_to_load) if file_to_load else None
     if df is None:
         st.warning("No data loaded. Please upload a valid CSV file.")
         return
 
-    df['Status'] = df['Last Note'].apply(categorize_case)
-    df['SR/Incident Number'] = df['Status'].apply(lambda x: x.split()[-1] if x != 'Not Triaged' else '')
-
-    target_users = ['anas.hasan', 'ali.babiker', 'mohammed.reda']
-    all_users = ['DIT-Team'] + target_users
+    all_users = [DIT_TEAM] + TARGET_USERS
+    filter_index = build_filter_index(file_hash, df)
+    reference_rollup = build_reference_rollup(file_hash, df)
 
     st.sidebar.header("🔍 Filters")
     selected_user = st.sidebar.selectbox("Select User", all_users, index=0)
-    selected_status = st.sidebar.selectbox("Filter by Status", ['All', 'Not Triaged', 'Pending SR/Incident'])
+    selected_status = st.sidebar.selectbox("Filter by Status", STATUS_OPTIONS)
 
-    min_date = df['Case Start Date'].min().date()
-    max_date = df['Case Start Date'].max().date()
+    min_date, max_date = filter_index.date_bounds
     date_range = st.sidebar.date_input("Date Range", [min_date, max_date], min_value=min_date, max_value=max_date)
 
-    if selected_user == 'DIT-Team':
-        user_filtered = df[df['Current User Id'].isin(target_users)]
-    else:
-        user_filtered = df[df['Current User Id'] == selected_user]
-
-    if len(date_range) == 2:
-        start_date, end_date = date_range
-        date_filtered = user_filtered[
-            (user_filtered['Case Start Date'].dt.date >= start_date) &
-            (user_filtered['Case Start Date'].dt.date <= end_date)
-        ]
-    else:
-        date_filtered = user_filtered
-
-    if selected_status == 'Not Triaged':
-        filtered_data = date_filtered[date_filtered['Status'] == 'Not Triaged']
-    elif selected_status == 'Pending SR/Incident':
-        filtered_data = date_filtered[date_filtered['Status'] != 'Not Triaged']
-    else:
-        filtered_data = date_filtered
+    mask = filter_index.mask(selected_user, selected_status, date_range)
+    filtered_data = df[mask]
 
     st.subheader(f"📈 Case Summary for {selected_user}")
     col1, col2, col3 = st.columns(3)
@@ -136,17 +106,7 @@ def main():
 
     if selected_status == 'Pending SR/Incident':
         st.subheader("🔖 Grouped by SR/Incident Number")
-        grouped = filtered_data.groupby('SR/Incident Number').agg({
-            'Case Id': 'count',
-            'Current User Id': lambda x: ', '.join(set(x)),
-            'Case Start Date': 'min',
-            'Sub Category': lambda x: ', '.join(set(x))
-        }).reset_index().rename(columns={
-            'Case Id': 'Number of Cases',
-            'Current User Id': 'Assigned To',
-            'Case Start Date': 'First Case Date',
-            'Sub Category': 'Categories'
-        }).sort_values('Number of Cases', ascending=False)
+        grouped = reference_rollup.summary(mask)
 
         st.dataframe(grouped, use_container_width=True)
 
@@ -157,24 +117,20 @@ def main():
             matched_cases = filtered_data[filtered_data['SR/Incident Number'] == search_input.strip()]
             if not matched_cases.empty:
                 st.success(f"Found {len(matched_cases)} case(s) linked to SR/Incident {search_input}")
-                st.dataframe(matched_cases, use_container_width=True)
+                st.dataframe(matched_cases, use_container_width=True, column_config={DAY_COLUMN: None})
             else:
                 st.warning(f"No cases found for SR/Incident Number: {search_input}")
 
     else:
         st.subheader("📋 Full Case List")
         search_text = st.text_input("🔎 Search Case ID, Status or Note", key="general_search")
-        searchable_data = filtered_data.copy()
+        searchable_data = filtered_data
 
         if search_text:
-            search_text = search_text.lower()
-            searchable_data = searchable_data[
-                searchable_data.apply(lambda row: search_text in str(row['Case Id']).lower()
-                                                   or search_text in str(row['Status']).lower()
-                                                   or search_text in str(row['Last Note']).lower(), axis=1)
-            ]
-
-        st.dataframe(searchable_data, use_container_width=True)
+            search_index = build_search_index(file_hash, df)
+            searchable_data = df[mask & search_index.mask(search_text)]
+
+        st.dataframe(searchable_data, use_container_width=True, column_config={DAY_COLUMN: None})
 
     st.markdown("---")
     st.markdown("🔧 **Developed by Anas H. Alrefai**")
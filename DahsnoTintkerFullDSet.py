@@ -3,10 +3,27 @@ import pandas as pd
 import re
 import io
 from datetime import datetime
+from case_export import EXPORT_FORMATS, available_export_formats, export_cases, frame_batches
+from case_loader import file_content_hash
+from case_pagination import paginate
+from case_search import CaseSearchIndex
 
 st.set_page_config(layout="wide")
 st.title("GPSSA Case Dashboard - Full Dataset")
 
+# Versions of the data kept loaded, older uploads are dropped from the shared caches
+CACHED_FILES = 4
+
+# Search index over the uploaded data, built once per file content and shared read-only
+@st.cache_resource(max_entries=CACHED_FILES)
+def build_search_index(file_hash, _df):
+    return CaseSearchIndex(_df, ['Emirates ID', 'mobile Number', 'Last Note'])
+
+# Filtered data export, written only when a download is requested and kept per file and filters
+@st.cache_resource(max_entries=8)
+def build_export(file_hash, filters, export_format, _df):
+    return export_cases(frame_batches(_df), export_format)
+
 uploaded_file = st.file_uploader("Upload Full Dataset CSV", type="csv")
 
 if uploaded_file:
@@ -61,25 +78,30 @@ if uploaded_file:
     if selected_type:
         filtered_df = filtered_df[filtered_df['Ref Type'].isin(selected_type)]
     if search_value:
-        search_value = search_value.lower()
-        filtered_df = filtered_df[filtered_df.apply(lambda row: search_value in str(row['Emirates ID']).lower()
-                                                    or search_value in str(row['mobile Number']).lower()
-                                                    or search_value in str(row['Last Note']).lower(), axis=1)]
+        search_index = build_search_index(file_content_hash(uploaded_file), df)
+        matched = df.index[search_index.search(search_value)]
+        filtered_df = filtered_df[filtered_df.index.isin(matched)]
 
-    # Group by Ref Number
+    # Group by Ref Number, keeping only each group's size and row positions
     grouped = filtered_df.groupby(['Ref Type', 'Ref Number'])
+    group_rows = grouped.indices
+    group_sizes = grouped.size().reset_index(name='Cases')
 
+    # Only the groups on the current page get an expander and a table
     st.subheader("Grouped Cases by SR/Incident")
-    for (ref_type, ref_number), group in grouped:
-        if pd.isna(ref_number):
-            continue
-        with st.expander(f"{ref_type} #{ref_number} - {len(group)} case(s)"):
+    group_page = paginate(group_sizes, "ref_groups", page_size=20, label="SR/Incident groups")
+    for ref_type, ref_number, cases in group_page.itertuples(index=False):
+        with st.expander(f"{ref_type} #{ref_number} - {cases} case(s)"):
+            group = filtered_df.iloc[group_rows[(ref_type, ref_number)]]
             st.dataframe(group[['Case Id', 'Process Status', 'Category', 'Last Note', 'Current User Id']])
 
-    # Show full filtered table
+    # Show the filtered table one page at a time
     st.subheader("Filtered Case List")
-    st.dataframe(filtered_df)
-
-    # Download filtered data
-    csv = filtered_df.to_csv(index=False).encode('utf-8')
-    st.download_button("Download Filtered Data as CSV", csv, "Filtered_Cases.csv", "text/csv")
+    st.dataframe(paginate(filtered_df, "filtered_cases", label="cases"))
+
+    # Download filtered data, the file is only written when the button is clicked
+    export_format = st.selectbox("Export format", available_export_formats())
+    extension, mime = EXPORT_FORMATS[export_format]
+    filters = (selected_user, tuple(selected_status), tuple(selected_type), search_value)
+    st.download_button("Download Filtered Data", lambda: build_export(
+        file_content_hash(uploaded_file), filters, export_format, filtered_df), f"Filtered_Cases{extension}", mime)
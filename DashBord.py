@@ -1,379 +1,472 @@
-import pandas as pd
-import streamlit as st
-import re
-import os
-import chardet
-from datetime import datetime
-import tkinter as tk
-from tkinter import filedialog
-
-# Set page config first
-st.set_page_config(layout="wide", page_title="GPSSA Case Dashboard", page_icon="📊")
-
-# File selection function - fixed version
-def select_file():
-    """Open a file dialog to select the CSV file"""
-    try:
-        root = tk.Tk()
-        root.withdraw()  # Hide the root window
-        root.wm_attributes('-topmost', 1)  # Bring dialog to front
-        filename = filedialog.askopenfilename(
-            title="Select GPSSA CSV file",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
-            initialdir=os.path.expanduser("~")  # Start at user home directory
-        )
-        root.destroy()  # Clean up the Tkinter instance
-        return filename
-    except Exception as e:
-        st.error(f"Could not open file dialog: {str(e)}")
-        return None
-
-# Function to detect file encoding
-def detect_encoding(file_path):
-    with open(file_path, 'rb') as f:
-        result = chardet.detect(f.read())
-    return result['encoding']
-
-# Load data function with robust file handling
-@st.cache_data
-def load_data(file_path):
-    """Load and preprocess the GPSSA case data"""
-    if not file_path or not os.path.exists(file_path):
-        return None
-    
-    # Detect file encoding
-    try:
-        detected_encoding = detect_encoding(file_path)
-    except Exception as e:
-        detected_encoding = 'utf-8-sig'  # Fallback to UTF-8 with BOM
-    
-    # Try loading with detected encoding first
-    try:
-        df = pd.read_csv(file_path, encoding=detected_encoding)
-    except Exception as e:
-        # Try multiple encodings to handle different file formats
-        encodings = ['utf-8-sig', 'windows-1256', 'iso-8859-6', 'cp1256', 'utf-8']
-        
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(file_path, encoding=encoding)
-                break
-            except Exception:
-                continue
-        else:
-            return None
-    
-    # Convert date columns with error handling
-    date_columns = ['Case Start Date', 'Last Note Date']
-    for col in date_columns:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], format='%d/%m/%Y', errors='coerce')
-    
-    # Remove rows with invalid dates
-    df = df.dropna(subset=['Case Start Date'])
-    
-    # Clean up any empty strings that might have been read as NaN
-    df = df.fillna('')
-    
-    # Ensure Last Note is treated as string and properly encoded
-    if 'Last Note' in df.columns:
-        df['Last Note'] = df['Last Note'].astype(str).apply(lambda x: x.encode('raw_unicode_escape').decode('utf-8', errors='replace'))
-    
-    return df
-
-# Main App
-def main():
-    st.title("📊 GPSSA Case Management Dashboard")
-    
-    # Initialize session state for file path if it doesn't exist
-    if 'file_path' not in st.session_state:
-        st.session_state.file_path = None
-    
-    # Add attribution
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### Developed by Anas H. Alrefai")
-    
-    # File selection in sidebar
-    st.sidebar.header("📂 Data Source")
-    file_option = st.sidebar.radio("Select data source:", 
-                                 ["Use default file", "Select different file"])
-    
-    if file_option == "Use default file":
-        # Try default locations
-        possible_paths = [
-            r"C:\Users\Admin\Desktop\Gpssa\20April.csv",
-            os.path.join(os.path.dirname(__file__), "20April.csv"),
-            os.path.join(os.getcwd(), "20April.csv"),
-            "20April.csv"
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                st.session_state.file_path = path
-                st.sidebar.success(f"Using default file: {st.session_state.file_path}")
-                break
-        else:
-            st.sidebar.warning("Default file not found")
-            st.session_state.file_path = None
-    else:
-        if st.sidebar.button("Browse for CSV File"):
-            selected_file = select_file()
-            if selected_file:
-                st.session_state.file_path = selected_file
-                st.sidebar.success(f"Selected file: {st.session_state.file_path}")
-            else:
-                st.sidebar.error("No file selected")
-                st.session_state.file_path = None
-    
-    # Load data
-    if st.session_state.file_path:
-        df = load_data(st.session_state.file_path)
-    else:
-        df = None
-    
-    if df is None:
-        st.warning("Please select a valid CSV file to continue")
-        return
-    
-    # Define users and add DIT-Team option
-    target_users = ['anas.hasan', 'ali.babiker', 'mohammed.reda']
-    all_users = ['DIT-Team'] + target_users
-
-    # Improved categorization function with better pattern matching
-    def categorize_case(note):
-        """Categorize cases based on notes to identify SR/Incident numbers"""
-        if pd.isna(note) or str(note).strip() == '':
-            return 'Not Triaged'
-        
-        note = str(note).lower()
-        
-        # Patterns to match SR/Incident numbers in English and Arabic
-        patterns = [
-            (r'(sr|service request|اس ار|طلب خدمة)\s*[:#]?\s*(\d{4,5})', 'SR'),
-            (r'(inc|incident|انسدنت|حالة)\s*[:#]?\s*(\d{4,5})', 'Incident'),
-            (r'\b(1[45]\d{3})\b', 'SR'),  # SR numbers starting with 14 or 15
-            (r'\b(2[12]\d{3})\b', 'Incident'),  # Incident numbers starting with 21 or 22
-            (r'(tkt|ticket|تيكت)\s*[_:]?\s*(\d{4,5})', 'Incident')  # Ticket numbers like Tkt_21905 or Tkt 21905
-        ]
-        
-        for pattern, prefix in patterns:
-            matches = re.finditer(pattern, note)
-            for match in matches:
-                number = match.group(2) if len(match.groups()) > 1 else match.group(1)
-                if prefix == 'SR' and (number.startswith('14') or number.startswith('15')):
-                    return f'Pending SR {number}'
-                elif prefix == 'Incident' and (number.startswith('21') or number.startswith('22')):
-                    return f'Pending Incident {number}'
-                elif prefix == 'Incident':  # For ticket numbers
-                    return f'Pending Incident {number}'
-        
-        return 'Not Triaged'
-
-    # Apply categorization and extract SR/Incident numbers
-    df['Status'] = df['Last Note'].apply(categorize_case)
-    df['SR/Incident Number'] = df['Status'].apply(lambda x: x.split()[-1] if x != 'Not Triaged' else '')
-
-    # Filters in sidebar
-    st.sidebar.header("🔍 Filters")
-
-    # User filter
-    selected_user = st.sidebar.selectbox("Select User", all_users, index=0)
-
-    # Status filter with clear options
-    status_options = ['All', 'Not Triaged', 'Pending SR/Incident']
-    selected_status = st.sidebar.selectbox("Filter by Status", status_options, index=0)
-
-    # Date range filter with improved date handling
-    min_date = df['Case Start Date'].min().to_pydatetime().date()
-    max_date = df['Case Start Date'].max().to_pydatetime().date()
-    date_range = st.sidebar.date_input(
-        "Date Range", 
-        [min_date, max_date],
-        min_value=min_date,
-        max_value=max_date
-    )
-
-    # Apply filters
-    if selected_user == 'DIT-Team':
-        user_filtered = df[df['Current User Id'].isin(target_users)]
-    else:
-        user_filtered = df[df['Current User Id'] == selected_user]
-
-    # Handle date range selection (user might not have selected both dates)
-    if len(date_range) == 2:
-        start_date, end_date = date_range
-        date_filtered = user_filtered[
-            (user_filtered['Case Start Date'].dt.date >= start_date) & 
-            (user_filtered['Case Start Date'].dt.date <= end_date)
-        ]
-    else:
-        date_filtered = user_filtered
-
-    # Apply status filter
-    if selected_status == 'Not Triaged':
-        filtered_data = date_filtered[date_filtered['Status'] == 'Not Triaged']
-    elif selected_status == 'Pending SR/Incident':
-        filtered_data = date_filtered[date_filtered['Status'] != 'Not Triaged']
-    else:
-        filtered_data = date_filtered
-
-    # Metrics row with improved formatting
-    st.subheader(f"📈 Case Summary for {selected_user}")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("Total Cases", len(filtered_data), help="Total cases matching your filters")
-    with col2:
-        pending = filtered_data[filtered_data['Status'] != 'Not Triaged']
-        st.metric("Pending SR/Incident", len(pending), help="Cases with pending SR or Incident numbers")
-    with col3:
-        st.metric("Not Triaged", len(filtered_data) - len(pending), help="Cases without SR or Incident numbers")
-
-    # Group cases by SR/Incident number if viewing pending cases
-    if selected_status == 'Pending SR/Incident':
-        st.subheader("🔖 Cases Grouped by SR/Incident Number")
-        
-        # Create grouped dataframe with more information
-        grouped_cases = filtered_data.groupby('SR/Incident Number').agg({
-            'Case Id': 'count',
-            'Current User Id': lambda x: ', '.join(set(x)),
-            'Case Start Date': 'min',
-            'Sub Category': lambda x: ', '.join(set(x))
-        }).rename(columns={
-            'Case Id': 'Number of Cases',
-            'Current User Id': 'Assigned To',
-            'Case Start Date': 'First Case Date',
-            'Sub Category': 'Categories'
-        }).sort_values('Number of Cases', ascending=False)
-        
-        # Reset index to make SR/Incident Number a column
-        grouped_cases = grouped_cases.reset_index()
-        
-        # Display the grouped cases table with improved formatting
-        st.dataframe(
-            grouped_cases,
-            use_container_width=True,
-            column_config={
-                "SR/Incident Number": st.column_config.TextColumn(
-                    "SR/Incident #",
-                    help="The service request or incident number"
-                ),
-                "Number of Cases": st.column_config.NumberColumn(
-                    "Cases",
-                    help="Number of cases linked to this SR/Incident"
-                ),
-                "Assigned To": st.column_config.TextColumn(
-                    "Assigned To",
-                    help="Users currently assigned these cases"
-                ),
-                "First Case Date": st.column_config.DateColumn(
-                    "First Case",
-                    help="Date of the earliest case in this group"
-                ),
-                "Categories": st.column_config.TextColumn(
-                    "Categories",
-                    help="Sub-categories of cases in this group"
-                )
-            }
-        )
-        
-        # Allow selection of specific SR/Incident for detailed view
-        selected_sr_incident = st.selectbox(
-            "Select SR/Incident to view details:",
-            [""] + grouped_cases["SR/Incident Number"].tolist()
-        )
-        
-        # Show detailed cases for selected SR/Incident Number
-        if selected_sr_incident and selected_sr_incident != "":
-            st.subheader(f"📋 Cases for {selected_sr_incident}")
-            detailed_cases = filtered_data[filtered_data['SR/Incident Number'] == selected_sr_incident]
-            
-            st.dataframe(
-                detailed_cases[[
-                    'Case Id', 
-                    'Case Start Date', 
-                    'Sub Category', 
-                    'Status', 
-                    'Current User Id',
-                    'Last Note'
-                ]].sort_values('Case Start Date', ascending=False),
-                height=300,
-                use_container_width=True,
-                column_config={
-                    "Case Id": "Case ID",
-                    "Case Start Date": st.column_config.DateColumn("Start Date"),
-                    "Sub Category": "Category",
-                    "Status": "Status",
-                    "Current User Id": "Assigned To",
-                    "Last Note": st.column_config.TextColumn(
-                        "Last Note",
-                        help="Last note with Arabic text preserved"
-                    )
-                }
-            )
-
-    # Main case details table with improved display
-    st.subheader("📋 Case Details")
-
-    # Determine columns to display based on filters
-    if selected_status == 'Pending SR/Incident':
-        display_cols = ['Case Id', 'Case Start Date', 'Sub Category', 'Status', 'SR/Incident Number', 'Current User Id', 'Last Note']
-    else:
-        display_cols = ['Case Id', 'Case Start Date', 'Sub Category', 'Status', 'Current User Id', 'Last Note']
-
-    # Display the data with improved formatting
-    st.dataframe(
-        filtered_data[display_cols].sort_values('Case Start Date', ascending=False),
-        height=600,
-        use_container_width=True,
-        column_config={
-            "Case Id": st.column_config.TextColumn("Case ID", width="small"),
-            "Case Start Date": st.column_config.DateColumn("Start Date", width="small"),
-            "Sub Category": st.column_config.TextColumn("Category", width="medium"),
-            "Status": st.column_config.TextColumn("Status", width="medium"),
-            "SR/Incident Number": st.column_config.TextColumn("SR/Incident #", width="small"),
-            "Current User Id": st.column_config.TextColumn("Assigned To", width="medium"),
-            "Last Note": st.column_config.TextColumn(
-                "Last Note", 
-                width="large",
-                help="Last note with Arabic text preserved"
-            )
-        }
-    )
-
-    # Download button for filtered data
-    csv = filtered_data.to_csv(index=False).encode('utf-8-sig')
-    st.sidebar.download_button(
-        "💾 Download Filtered Data",
-        csv,
-        f"gpssa_cases_{selected_user}_{datetime.now().strftime('%Y%m%d')}.csv",
-        "text/csv",
-        help="Download the currently filtered data as a CSV file"
-    )
-
-    # Add some helpful information in the sidebar
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### ℹ️ Helpful Information")
-    st.sidebar.markdown("""
-    - **DIT-Team** shows all cases assigned to the target users
-    - **Pending SR/Incident** shows cases with identified tracking numbers
-    - **Not Triaged** shows cases needing review
-    - Click column headers to sort tables
-    """)
-
-    # Add a refresh button
-    if st.sidebar.button("🔄 Refresh Data"):
-        st.cache_data.clear()
-        st.rerun()
-
-    # Add debug information (can be removed in production)
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("### 🐞 Debug Info")
-    st.sidebar.text(f"Working directory: {os.getcwd()}")
-    st.sidebar.text(f"Python version: {os.sys.version}")
-
-    # Add footer with attribution
-    st.markdown("---")
-    st.markdown("### Developed and maintained by Anas H. Alrefai")
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+import time
+import_started = time.perf_counter()
+import pandas as pd
+import streamlit as st
+import os
+from datetime import datetime
+from case_categorizer import DIT_TEAM, enrich_cases
+from case_cube import BREAKDOWNS
+from case_delta import OLDER_THAN_STORE, ingest_export
+from case_export import EXPORT_FORMATS, available_export_formats, export_cases
+from case_filters import STATUS_OPTIONS, CaseFilterIndex
+from case_loader import (data_directories, expand_sources, file_content_hash, files_content_hash, is_within,
+                         list_case_files, load_case_files, memory_report)
+from case_pagination import paginate, paginate_query
+from case_queries import FrameCaseQueries
+from case_rollup import ReferenceRollup
+from case_timing import TIMINGS, process_memory
+from case_watcher import POLL_INTERVAL, CaseFileWatcher
+
+# Time spent importing the modules above, recorded once per server process
+TIMINGS.record_once('import', time.perf_counter() - import_started)
+
+# Set page config first
+st.set_page_config(layout="wide", page_title="GPSSA Case Dashboard", page_icon="📊")
+
+# Users grouped under the DIT-Team option
+TARGET_USERS = ['anas.hasan', 'ali.babiker', 'mohammed.reda']
+
+# Where filters, grouping and exports run: "pandas" on the loaded frame or "sqlite" on a database next to the file
+QUERY_ENGINE = os.environ.get('GPSSA_QUERY_ENGINE', 'pandas')
+
+# Versions of the data kept loaded, the files selected least recently are dropped from the shared caches
+CACHED_FILES = 4
+
+# Folders case files can be picked from, set with GPSSA_DATA_DIRS, the app's folder by default
+DATA_DIRS = data_directories(os.path.dirname(os.path.abspath(__file__)))
+
+# File selection on the server, limited to the CSV files in the data folders
+def select_file():
+    """Pick a CSV file from the configured data folders in the sidebar"""
+    if not DATA_DIRS:
+        st.sidebar.error("No data folder found, set GPSSA_DATA_DIRS")
+        return None
+    data_dir = st.sidebar.selectbox("Data folder", DATA_DIRS)
+    files = list_case_files(data_dir)
+    if not files:
+        st.sidebar.warning("No CSV files in this folder")
+        return None
+    return st.sidebar.selectbox("CSV file", files, format_func=os.path.basename)
+
+# Load data function with chunked file handling
+def load_data(file_path, progress=None):
+    """Load and preprocess the GPSSA case data, returning it with the changes since the previous export"""
+    if not file_path or not os.path.exists(file_path):
+        return None, None
+    
+    # Merge the export into the case store, only new and changed cases are categorized again
+    return ingest_export(file_path, TARGET_USERS, progress=progress)
+
+def load_enriched_data(file_path, progress=None):
+    """Load the case data and add the Status, SR/Incident Number and User Group columns"""
+    with TIMINGS.stage('load'):
+        df, delta = load_data(file_path, progress)
+        if df is None:
+            return None, None
+        return enrich_cases(df, TARGET_USERS), delta
+
+def clear_file_caches(file_hash):
+    """Drop the cached indexes and reports built for one version of a file"""
+    data_memory_report.clear(file_hash, None)
+    build_filter_index.clear(file_hash, None)
+    build_reference_rollup.clear(file_hash, None)
+    build_case_cube.clear(file_hash, None)
+    # Exports are also keyed by the filters, so all of them are dropped, the rest are rebuilt on the next download
+    build_export.clear()
+
+# Load and enrich the data once per file, then keep it current with a background watcher
+@st.cache_resource(max_entries=CACHED_FILES)
+def get_case_watcher(file_path):
+    """Load a case file and watch it for changes, shared by every session"""
+    progress_bar = st.progress(0.0, text="Loading case data...")
+    watcher = CaseFileWatcher(file_path, load_enriched_data, on_replace=clear_file_caches,
+                              progress=lambda fraction: progress_bar.progress(fraction, text="Loading case data..."))
+    progress_bar.empty()
+    return watcher
+
+# Load a folder of exports in a process pool and merge them, once per combined file content
+@st.cache_resource(max_entries=CACHED_FILES)
+def load_enriched_files(file_hash, _paths):
+    """Load, merge and enrich several case exports, keeping the latest row of each case"""
+    progress_bar = st.progress(0.0, text="Loading case files...")
+    df = load_case_files(_paths, progress=lambda fraction: progress_bar.progress(fraction, text="Loading case files..."))
+    progress_bar.empty()
+    if df is None:
+        return None
+    return enrich_cases(df, TARGET_USERS)
+
+# SQLite copy of a case file, built once per file content and queried instead of loading the frame
+@st.cache_resource(max_entries=CACHED_FILES)
+def open_case_database(file_path, file_hash):
+    """Open the indexed SQLite database of a case file, building it when the file changed"""
+    from case_database import CaseDatabase
+
+    progress_bar = st.progress(0.0, text="Loading case data...")
+    database = CaseDatabase.open(file_path, TARGET_USERS,
+                                 progress=lambda fraction: progress_bar.progress(fraction, text="Loading case data..."))
+    progress_bar.empty()
+    return database
+
+# Check the watched file every few seconds and rerun the app once a reload has finished
+@st.fragment(run_every=POLL_INTERVAL)
+def watch_data_source(watcher):
+    """Poll the data source and show whether a newer version is being loaded"""
+    if watcher.poll():
+        st.caption("⏳ Loading a newer version of the data file...")
+    elif watcher.error:
+        st.caption(f"⚠️ Could not reload the data file: {watcher.error}")
+    if st.session_state.get('data_version', watcher.version) != watcher.version:
+        st.rerun(scope="app")
+
+# Memory report for the loaded data, computed once per file content
+@st.cache_data(max_entries=CACHED_FILES)
+def data_memory_report(file_hash, _df):
+    """Return the data's memory in bytes as plain object columns and with compact dtypes"""
+    return memory_report(_df)
+
+# Filter index over the loaded data, built once per file content and shared read-only
+@st.cache_resource(max_entries=CACHED_FILES)
+def build_filter_index(file_hash, _df):
+    """Precompute the user, status and date lookups for the sidebar filters"""
+    return CaseFilterIndex(_df, TARGET_USERS)
+
+# SR/Incident rollup of the loaded data, built once per file content and shared read-only
+@st.cache_resource(max_entries=CACHED_FILES)
+def build_reference_rollup(file_hash, _df):
+    """Aggregate the pending cases per SR/Incident number"""
+    return ReferenceRollup(_df)
+
+# Case counts per day, user, status and category, built once per file content and read by the trend charts
+@st.cache_resource(max_entries=CACHED_FILES)
+def build_case_cube(file_hash, _queries):
+    """Aggregate the cases into the cube the trend and heatmap charts read"""
+    with TIMINGS.stage('cube'):
+        return _queries.case_cube()
+
+# Filtered data export, written only when a download is requested and kept per data version and filters
+@st.cache_resource(max_entries=8)
+def build_export(file_hash, filters, export_format, _queries):
+    """Write the cases matching the filters in an export format, Excel also gets the SR/Incident rollup"""
+    with TIMINGS.stage('export'):
+        rollup = _queries.rollup(*filters) if export_format == 'Excel' else None
+        return export_cases(_queries.export_batches(*filters), export_format, rollup)
+
+# Main App
+def main():
+    st.title("📊 GPSSA Case Management Dashboard")
+    
+    # Initialize session state for file path if it doesn't exist
+    if 'file_path' not in st.session_state:
+        st.session_state.file_path = None
+    
+    # Add attribution
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### Developed by Anas H. Alrefai")
+    
+    # File selection in sidebar
+    st.sidebar.header("📂 Data Source")
+    file_option = st.sidebar.radio("Select data source:", 
+                                 ["Use default file", "Select different file", "Merge a folder of files"])
+    
+    if file_option == "Use default file":
+        # Try default locations
+        possible_paths = [
+            r"C:\Users\Admin\Desktop\Gpssa\20April.csv",
+            os.path.join(os.path.dirname(__file__), "20April.csv"),
+            os.path.join(os.getcwd(), "20April.csv"),
+            "20April.csv"
+        ]
+        
+        for path in possible_paths:
+            if os.path.exists(path):
+                st.session_state.file_path = path
+                st.sidebar.success(f"Using default file: {st.session_state.file_path}")
+                break
+        else:
+            st.sidebar.warning("Default file not found")
+            st.session_state.file_path = None
+    elif file_option == "Merge a folder of files":
+        # Every CSV in a folder, or the files matching a pattern such as exports/*April.csv
+        pattern = st.sidebar.text_input("Folder or file pattern", value=DATA_DIRS[0] if DATA_DIRS else "")
+        file_paths = [path for path in expand_sources(pattern) if is_within(path, DATA_DIRS)] if pattern else []
+        if file_paths:
+            st.sidebar.success(f"Merging {len(file_paths)} files by Case Id")
+        else:
+            st.sidebar.warning("No CSV files found")
+    else:
+        st.session_state.file_path = select_file()
+    
+    # Load data, the watcher keeps serving the loaded version until a changed file is reloaded
+    watcher = None
+    df, delta, queries = None, None, None
+    if file_option == "Merge a folder of files":
+        file_hash = files_content_hash(file_paths)
+        df = load_enriched_files(file_hash, file_paths) if file_paths else None
+    elif not st.session_state.file_path or not os.path.exists(st.session_state.file_path):
+        pass
+    elif QUERY_ENGINE == 'sqlite':
+        file_hash = file_content_hash(st.session_state.file_path)
+        queries = open_case_database(os.path.abspath(st.session_state.file_path), file_hash)
+    else:
+        watcher = get_case_watcher(os.path.abspath(st.session_state.file_path))
+        file_hash, (df, delta) = watcher.snapshot()
+        st.session_state.data_version = watcher.version
+        with st.sidebar:
+            watch_data_source(watcher)
+
+    # Queries run on the loaded frame through its precomputed indexes, unless a database is used
+    if df is not None:
+        queries = FrameCaseQueries(df, build_filter_index(file_hash, df), build_reference_rollup(file_hash, df))
+    
+    if queries is None:
+        st.warning("Please select a valid CSV file to continue")
+        return
+
+    # Changes against the previous export merged into the case store
+    if delta and OLDER_THAN_STORE in delta:
+        st.sidebar.warning(f"This export is older than {delta[OLDER_THAN_STORE]}, the latest one in the case "
+                           "store, so it was loaded on its own without comparing it")
+    elif delta:
+        st.sidebar.markdown("**🆕 Changes Since Previous Export**")
+        st.sidebar.text(f"New: {delta['new']:,}  Changed: {delta['changed']:,}  Removed: {delta['removed']:,}")
+        st.sidebar.text(f"Newly assigned to {DIT_TEAM}: {delta['team_assigned']:,}")
+        st.sidebar.text(f"New SR/Incident links: {delta['new_sr_links']:,}")
+    
+    # Add DIT-Team option to the users
+    all_users = [DIT_TEAM] + TARGET_USERS
+
+    # Filters in sidebar
+    st.sidebar.header("🔍 Filters")
+
+    # User filter
+    selected_user = st.sidebar.selectbox("Select User", all_users, index=0)
+
+    # Status filter with clear options
+    selected_status = st.sidebar.selectbox("Filter by Status", STATUS_OPTIONS, index=0)
+
+    # Date range filter with improved date handling
+    min_date, max_date = queries.date_bounds
+    date_range = st.sidebar.date_input(
+        "Date Range", 
+        [min_date, max_date],
+        min_value=min_date,
+        max_value=max_date
+    )
+
+    # Every query below applies the same sidebar filters
+    filters = (selected_user, selected_status, date_range)
+    with TIMINGS.stage('filter'):
+        total_cases, not_triaged_cases = queries.counts(*filters)
+
+    # Metrics row with improved formatting
+    st.subheader(f"📈 Case Summary for {selected_user}")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Cases", total_cases, help="Total cases matching your filters")
+    with col2:
+        st.metric("Pending SR/Incident", total_cases - not_triaged_cases, help="Cases with pending SR or Incident numbers")
+    with col3:
+        st.metric("Not Triaged", not_triaged_cases, help="Cases without SR or Incident numbers")
+
+    # Trend and heatmap charts, read from the precomputed case cube instead of the case rows
+    st.subheader("📈 Backlog Trends")
+    cube = build_case_cube(file_hash, queries)
+    trend_col1, trend_col2 = st.columns([3, 1])
+    with trend_col2:
+        breakdown = st.selectbox("Break down by", BREAKDOWNS, index=0)
+        cumulative = st.checkbox("Open backlog", value=False,
+                                 help="Cases of this export open on each day, counting those started before the "
+                                      "date range, instead of the cases started per day")
+        heatmap_rows = st.selectbox("Heatmap rows", ['Sub Category', 'User', 'Request Type'], index=0)
+        heatmap_period = st.radio("Heatmap period", ['Week', 'Month'], horizontal=True)
+    with TIMINGS.stage('charts'):
+        cube_users = TARGET_USERS if selected_user == DIT_TEAM else [selected_user]
+        trend = cube.trend(breakdown, cube_users, selected_status, date_range, cumulative=cumulative)
+        heatmap = cube.heatmap(heatmap_rows, cube_users, selected_status, date_range,
+                               period='W' if heatmap_period == 'Week' else 'M')
+        with trend_col1:
+            st.area_chart(trend, y_label="Cases")
+            if heatmap.empty:
+                st.info("No cases in the selected range")
+            else:
+                import altair as alt
+                st.altair_chart(alt.Chart(heatmap).mark_rect().encode(
+                    x=alt.X('Period:T', title=heatmap_period, timeUnit='yearmonthdate'),
+                    y=alt.Y(f'{heatmap_rows}:N', title=heatmap_rows, sort='-color'),
+                    color=alt.Color('Cases:Q', scale=alt.Scale(scheme='blues')),
+                    tooltip=[f'{heatmap_rows}:N', alt.Tooltip('Period:T', title=heatmap_period), 'Cases:Q']
+                ), use_container_width=True)
+
+    # Group cases by SR/Incident number if viewing pending cases
+    if selected_status == 'Pending SR/Incident':
+        st.subheader("🔖 Cases Grouped by SR/Incident Number")
+        
+        # Roll up the filtered cases per SR/Incident number
+        with TIMINGS.stage('group'):
+            grouped_cases = queries.rollup(*filters)
+        
+        # Display one page of the grouped cases table with improved formatting
+        st.dataframe(
+            paginate(grouped_cases, "grouped_cases", page_size=50, label="SR/Incidents"),
+            use_container_width=True,
+            column_config={
+                "SR/Incident Number": st.column_config.TextColumn(
+                    "SR/Incident #",
+                    help="The service request or incident number"
+                ),
+                "Number of Cases": st.column_config.NumberColumn(
+                    "Cases",
+                    help="Number of cases linked to this SR/Incident"
+                ),
+                "Assigned To": st.column_config.TextColumn(
+                    "Assigned To",
+                    help="Users currently assigned these cases"
+                ),
+                "First Case Date": st.column_config.DateColumn(
+                    "First Case",
+                    help="Date of the earliest case in this group"
+                ),
+                "Categories": st.column_config.TextColumn(
+                    "Categories",
+                    help="Sub-categories of cases in this group"
+                ),
+                "Case Ids": st.column_config.ListColumn(
+                    "Case IDs",
+                    help="Cases linked to this SR/Incident"
+                )
+            }
+        )
+        
+        # Allow selection of specific SR/Incident for detailed view
+        selected_sr_incident = st.selectbox(
+            "Select SR/Incident to view details:",
+            [""] + grouped_cases["SR/Incident Number"].tolist()
+        )
+        
+        # Show detailed cases for selected SR/Incident Number
+        if selected_sr_incident and selected_sr_incident != "":
+            st.subheader(f"📋 Cases for {selected_sr_incident}")
+            detailed_cases = queries.cases(*filters, [
+                'Case Id', 
+                'Case Start Date', 
+                'Sub Category', 
+                'Status', 
+                'Current User Id',
+                'Last Note'
+            ], reference=selected_sr_incident)
+            
+            st.dataframe(
+                detailed_cases,
+                height=300,
+                use_container_width=True,
+                column_config={
+                    "Case Id": "Case ID",
+                    "Case Start Date": st.column_config.DateColumn("Start Date"),
+                    "Sub Category": "Category",
+                    "Status": "Status",
+                    "Current User Id": "Assigned To",
+                    "Last Note": st.column_config.TextColumn(
+                        "Last Note",
+                        help="Last note with Arabic text preserved"
+                    )
+                }
+            )
+
+    # Main case details table with improved display
+    st.subheader("📋 Case Details")
+
+    # Determine columns to display based on filters
+    if selected_status == 'Pending SR/Incident':
+        display_cols = ['Case Id', 'Case Start Date', 'Sub Category', 'Status', 'SR/Incident Number', 'Current User Id', 'Last Note']
+    else:
+        display_cols = ['Case Id', 'Case Start Date', 'Sub Category', 'Status', 'Current User Id', 'Last Note']
+
+    # Display one page of the data with improved formatting, only that page is sent to the browser
+    with TIMINGS.stage('render'):
+        st.dataframe(
+            paginate_query(total_cases, lambda offset, limit: queries.cases(*filters, display_cols, offset=offset, limit=limit),
+                           "case_details", label="cases"),
+            height=600,
+            use_container_width=True,
+            column_config={
+                "Case Id": st.column_config.TextColumn("Case ID", width="small"),
+                "Case Start Date": st.column_config.DateColumn("Start Date", width="small"),
+                "Sub Category": st.column_config.TextColumn("Category", width="medium"),
+                "Status": st.column_config.TextColumn("Status", width="medium"),
+                "SR/Incident Number": st.column_config.TextColumn("SR/Incident #", width="small"),
+                "Current User Id": st.column_config.TextColumn("Assigned To", width="medium"),
+                "Last Note": st.column_config.TextColumn(
+                    "Last Note", 
+                    width="large",
+                    help="Last note with Arabic text preserved"
+                )
+            }
+        )
+
+    # Download button for filtered data, the file is only written when it is clicked
+    export_format = st.sidebar.selectbox("Export format", available_export_formats())
+    extension, mime = EXPORT_FORMATS[export_format]
+    st.sidebar.download_button(
+        "💾 Download Filtered Data",
+        lambda: build_export(file_hash, filters, export_format, queries),
+        f"gpssa_cases_{selected_user}_{datetime.now().strftime('%Y%m%d')}{extension}",
+        mime,
+        help="Download the currently filtered data in the selected format"
+    )
+
+    # Add some helpful information in the sidebar
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### ℹ️ Helpful Information")
+    st.sidebar.markdown("""
+    - **DIT-Team** shows all cases assigned to the target users
+    - **Pending SR/Incident** shows cases with identified tracking numbers
+    - **Not Triaged** shows cases needing review
+    - Click column headers to sort tables
+    - Large tables are shown one page at a time, use the page selector above them
+    """)
+
+    # Check the data file now instead of waiting for the next poll
+    if st.sidebar.button("🔄 Refresh Data"):
+        if watcher is not None:
+            watcher.refresh()
+        st.rerun()
+
+    # Add debug information (can be removed in production)
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### 🐞 Debug Info")
+    st.sidebar.text(f"Working directory: {os.getcwd()}")
+    st.sidebar.text(f"Python version: {os.sys.version}")
+
+    # Memory used by the loaded data before and after compacting the column dtypes
+    st.sidebar.text(f"Query engine: {QUERY_ENGINE if df is None else 'pandas'}")
+    if df is not None:
+        memory_before, memory_after = data_memory_report(file_hash, df)
+        st.sidebar.text(f"Data memory: {memory_before / 1e6:.1f} MB -> {memory_after / 1e6:.1f} MB")
+
+    # The loaded data is held once per server process and shared by every session
+    process_bytes = process_memory()
+    if process_bytes is not None:
+        st.sidebar.text(f"Server process memory: {process_bytes / 1e6:.1f} MB")
+
+    # Timings of the load, filter, group, render and export stages over the recent reruns of every session
+    with st.sidebar.expander("⏱️ Stage Timings"):
+        summary = TIMINGS.summary()
+        if summary.empty:
+            st.caption("No stages recorded yet")
+        else:
+            st.dataframe(summary, hide_index=True, use_container_width=True,
+                         column_config={col: st.column_config.NumberColumn(format="%.1f")
+                                        for col in summary.columns[2:]})
+            st.line_chart(TIMINGS.history(['rerun', 'filter', 'group', 'render', 'export']))
+            st.download_button("Download metrics", TIMINGS.prometheus_text(), "gpssa_metrics.prom", "text/plain",
+                               help="Stage timings in the Prometheus text format")
+
+    # Add footer with attribution
+    st.markdown("---")
+    st.markdown("### Developed and maintained by Anas H. Alrefai")
+
+if __name__ == "__main__":
+    with TIMINGS.stage('rerun'):
+        main()
+    # Keep the GPSSA_METRICS_FILE text file current for a node exporter textfile collector
+    TIMINGS.publish()
\ No newline at end of file
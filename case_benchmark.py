@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from case_categorizer import categorize_notes, enrich_cases
+from case_cube import CaseCube
+from case_filters import STATUS_OPTIONS, CaseFilterIndex
+from case_loader import detect_encoding, load_cases
+from case_rollup import ReferenceRollup
+from case_search import CaseSearchIndex
+
+# Dataset sizes benchmarked by default
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# Users grouped under DIT-Team, the same team as the dashboards
+TEAM_USERS = ['anas.hasan', 'ali.babiker', 'mohammed.reda']
+
+# Other users the synthetic cases are assigned to, '' for unassigned cases
+OTHER_USERS = ['sara.musa', 'Salma.Ahmed', 'Khalid.Salaheldin', 'fatima.bero', 'Mazen.Hamad', 'aws.alsamadi', '']
+
+REQUEST_TYPES = ['Inquiry', 'Complaint', 'Suggestion', 'POPInquiry']
+
+SUB_CATEGORIES = ['Service submission', 'Purchase additional years', 'Payment', 'End of service',
+                  'Incorrect salary', 'Merge service period', 'General', 'طلب خدمة', 'استفسار عام']
+
+# Last Note templates, {n} is replaced with a 4 or 5 digit number
+NOTE_TEMPLATES = [
+    'This is an enquiry not technical issue',
+    'As per the meeting held yesterday the issue remains unresolved.',
+    'Raised SR {n} for the portal issue',
+    'sr#{n} pending with the vendor',
+    'Incident {n} created, waiting for the fix',
+    'inc: {n} assigned to DIT',
+    'Tkt_{n} escalated',
+    'ticket {n} under review',
+    'Follow up on 1{n} please',
+    'تم رفع طلب خدمة {n} للفريق المختص',
+    'تم فتح انسدنت {n}',
+    'المشكلة مستمرة ولم يتم حلها',
+    'يرجى التواصل مع المتعامل',
+]
+
+# Search queries timed against the search index
+SEARCH_QUERIES = ['15', 'pending', 'sr#', 'ال', 'vendor issue', 'zzz']
+
+
+def generate_cases(rows, seed=0):
+    """Return a synthetic case export with the dashboards' schema, dates as day/month/year text"""
+    rng = np.random.default_rng(seed)
+    users = np.array(TEAM_USERS + OTHER_USERS, dtype=object)
+    starts = np.datetime64('2024-01-01') + rng.integers(0, 480, rows).astype('timedelta64[D]')
+    last_notes = starts + rng.integers(0, 60, rows).astype('timedelta64[D]')
+    templates = rng.integers(0, len(NOTE_TEMPLATES), rows)
+    numbers = rng.integers(1000, 25000, rows)
+    notes = [NOTE_TEMPLATES[t].replace('{n}', str(n)) for t, n in zip(templates, numbers)]
+    return pd.DataFrame({
+        'Request Type': rng.choice(REQUEST_TYPES, rows),
+        'Case Id': rng.permutation(rows) + 300000,
+        'Case Start Date': pd.to_datetime(starts).strftime('%d/%m/%Y'),
+        'Sub Category': rng.choice(SUB_CATEGORIES, rows),
+        'Last Admin': users[rng.integers(0, len(users), rows)],
+        'Last Note': notes,
+        'Last Note Date': pd.to_datetime(last_notes).strftime('%d/%m/%Y'),
+        'Current User Id': users[rng.integers(0, len(users), rows)],
+    })
+
+
+def benchmark(path, rows):
+    """Time each dashboard stage on one synthetic export and return a list of result dicts"""
+    results = []
+
+    def timed(stage, func):
+        started = time.perf_counter()
+        value = func()
+        results.append({'rows': rows, 'stage': stage, 'seconds': round(time.perf_counter() - started, 6)})
+        return value
+
+    def detect():
+        with open(path, 'rb') as f:
+            return detect_encoding(f)
+
+    timed('encoding_detection', detect)
+    df = timed('load', lambda: load_cases(path))
+    categorized = timed('categorize', lambda: categorize_notes(df['Last Note']))
+    df = timed('enrich', lambda: enrich_cases(df.join(categorized), TEAM_USERS))
+
+    filter_index = timed('filter_index', lambda: CaseFilterIndex(df, TEAM_USERS))
+    date_range = filter_index.date_bounds
+    users = ['DIT-Team'] + TEAM_USERS + OTHER_USERS[:2]
+    masks = timed('filters', lambda: [filter_index.mask(user, status, date_range)
+                                      for user in users for status in STATUS_OPTIONS])
+
+    rollup = timed('rollup_build', lambda: ReferenceRollup(df))
+    timed('rollup_filtered', lambda: [rollup.summary(mask) for mask in masks])
+
+    cube = timed('cube_build', lambda: CaseCube(df))
+    timed('trend', lambda: [cube.trend(by, date_range=date_range) for by in ('Status', 'Sub Category')])
+
+    search_index = timed('search_index', lambda: CaseSearchIndex(df, ['Case Id', 'Status', 'Last Note']))
+    timed('search', lambda: [search_index.search(query) for query in SEARCH_QUERIES])
+
+    timed('csv_export', lambda: df.to_csv(index=False).encode('utf-8-sig'))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the stages that got slower than the baseline by more than ``tolerance`` (0.2 = 20%)"""
+    previous = {(r['rows'], r['stage']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['rows'], result['stage']))
+        if before and result['seconds'] > before * (1 + tolerance):
+            regressions.append({**result, 'baseline_seconds': before})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the case dashboard stages on synthetic exports")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="rows per synthetic export")
+    parser.add_argument("--encoding", default="utf-8", help="encoding the synthetic exports are written in")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per size, the fastest run of each stage is kept")
+    parser.add_argument("--data-dir", default=None, help="keep the generated exports in this folder")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON file the results go to")
+    parser.add_argument("--baseline", default=None, help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='gpssa-bench-')
+    os.makedirs(data_dir, exist_ok=True)
+    results = []
+    for rows in args.sizes:
+        path = os.path.join(data_dir, f'cases_{rows}.csv')
+        if not os.path.exists(path):
+            generate_cases(rows).to_csv(path, index=False, encoding=args.encoding)
+        runs = [benchmark(path, rows) for _ in range(args.repeat)]
+        for stage_runs in zip(*runs):
+            best = min(stage_runs, key=lambda r: r['seconds'])
+            results.append(best)
+            print(f"{rows:>9,} rows  {best['stage']:<20} {best['seconds']:.4f}s")
+        if not args.data_dir:
+            os.remove(path)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'encoding': args.encoding,
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"Regression: {r['rows']:,} rows {r['stage']} {r['baseline_seconds']:.4f}s -> {r['seconds']:.4f}s")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import re
+import pandas as pd
+
+# Status label for cases without an SR/Incident reference
+NOT_TRIAGED = 'Not Triaged'
+
+# User group shared by the cases assigned to the DIT team members
+DIT_TEAM = 'DIT-Team'
+
+# Patterns to match SR/Incident numbers in English and Arabic, in priority order.
+# Each entry is (pattern, prefix) exactly as used by the original per-row categorizer.
+CASE_PATTERNS = [
+    (r'(sr|service request|اس ار|طلب خدمة)\s*[:#]?\s*(\d{4,5})', 'SR'),
+    (r'(inc|incident|انسدنت|حالة)\s*[:#]?\s*(\d{4,5})', 'Incident'),
+    (r'\b(1[45]\d{3})\b', 'SR'),  # SR numbers starting with 14 or 15
+    (r'\b(2[12]\d{3})\b', 'Incident'),  # Incident numbers starting with 21 or 22
+    (r'(tkt|ticket|تيكت)\s*[_:]?\s*(\d{4,5})', 'Incident')  # Ticket numbers like Tkt_21905 or Tkt 21905
+]
+
+# Compiled once at import, used by the scalar categorize_case
+_COMPILED_PATTERNS = [(re.compile(pattern), prefix) for pattern, prefix in CASE_PATTERNS]
+
+# Batched equivalent of CASE_PATTERNS as a single anchored alternation.
+# Each branch is tried in order from the start of the note, and the lazy ``.*?``
+# finds the leftmost match of that branch, which reproduces the "first pattern
+# wins, first match within the pattern wins" behaviour of categorize_case.
+# Explicit SR references only count when the number starts with 14 or 15,
+# mirroring the ``startswith`` check the per-row loop does after matching.
+_COMBINED_PATTERN = re.compile(
+    r'^(?:'
+    r'.*?(?:sr|service request|اس ار|طلب خدمة)\s*[:#]?\s*(?P<sr_ref>1[45]\d{2,3})'
+    r'|.*?(?:inc|incident|انسدنت|حالة)\s*[:#]?\s*(?P<inc_ref>\d{4,5})'
+    r'|.*?\b(?P<sr_num>1[45]\d{3})\b'
+    r'|.*?\b(?P<inc_num>2[12]\d{3})\b'
+    r'|.*?(?:tkt|ticket|تيكت)\s*[_:]?\s*(?P<tkt_ref>\d{4,5})'
+    r')',
+    re.DOTALL
+)
+
+# Named groups of _COMBINED_PATTERN and the status prefix each one maps to
+_GROUP_PREFIXES = [
+    ('sr_ref', 'SR'),
+    ('inc_ref', 'Incident'),
+    ('sr_num', 'SR'),
+    ('inc_num', 'Incident'),
+    ('tkt_ref', 'Incident')
+]
+
+
+def categorize_case(note):
+    """Categorize a single case note to identify SR/Incident numbers"""
+    if pd.isna(note) or str(note).strip() == '':
+        return NOT_TRIAGED
+
+    note = str(note).lower()
+
+    for pattern, prefix in _COMPILED_PATTERNS:
+        for match in pattern.finditer(note):
+            number = match.group(2) if len(match.groups()) > 1 else match.group(1)
+            if prefix == 'SR' and number.startswith(('14', '15')):
+                return f'Pending SR {number}'
+            elif prefix == 'Incident':
+                return f'Pending Incident {number}'
+
+    return NOT_TRIAGED
+
+
+def categorize_notes(notes):
+    """Categorize a whole column of notes in one batched pass.
+
+    Returns a DataFrame aligned with ``notes`` holding the ``Status`` and
+    ``SR/Incident Number`` columns, with the same values categorize_case
+    would give row by row.
+    """
+    lowered = notes.fillna('').astype(str).str.lower()
+    extracted = lowered.str.extract(_COMBINED_PATTERN)
+
+    status = pd.Series(NOT_TRIAGED, index=notes.index, dtype=object)
+    number = pd.Series('', index=notes.index, dtype=object)
+    for group, prefix in _GROUP_PREFIXES:
+        found = extracted[group].notna() & (number == '')
+        number[found] = extracted.loc[found, group]
+        status[found] = f'Pending {prefix} ' + extracted.loc[found, group]
+
+    return pd.DataFrame({'Status': status.astype('category'), 'SR/Incident Number': number})
+
+
+def enrich_cases(df, team_users):
+    """Return a new frame with the derived Status, SR/Incident Number and User Group columns.
+
+    Cases assigned to one of ``team_users`` get the ``DIT-Team`` user group,
+    every other case keeps its own user id. Frames that are already
+    categorized (loaded from a snapshot) keep their Status columns. The
+    reference numbers are stored with the Arrow-backed string dtype, as the
+    enriched frame is shared read-only between sessions. The input frame is
+    not modified.
+    """
+    if 'Status' in df.columns and 'SR/Incident Number' in df.columns:
+        categorized = df[['Status', 'SR/Incident Number']]
+    else:
+        categorized = categorize_notes(df['Last Note'])
+    users = df['Current User Id']
+    user_group = users.astype(object).where(~users.isin(team_users), DIT_TEAM).astype('category')
+    return df.assign(**{
+        'Status': categorized['Status'],
+        'SR/Incident Number': categorized['SR/Incident Number'].astype('str'),
+        'User Group': user_group
+    })
+
+
+if __name__ == '__main__':
+    # Parity check against the per-row categorizer: python case_categorizer.py <csv>
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else '20April.csv'
+    notes = pd.read_csv(path, encoding='utf-8', encoding_errors='replace')['Last Note']
+    expected = notes.apply(categorize_case)
+    actual = categorize_notes(notes)['Status']
+    mismatches = notes[expected != actual]
+    print(f"{len(notes)} notes checked, {len(mismatches)} mismatches")
+    for idx in mismatches.index[:20]:
+        print(f"  row {idx}: expected {expected[idx]!r}, got {actual[idx]!r}")
+    sys.exit(1 if len(mismatches) else 0)
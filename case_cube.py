@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from case_categorizer import NOT_TRIAGED
+from case_loader import DAY_COLUMN, day_numbers
+
+# Dimensions the case counts are kept per, in key order
+CUBE_DIMENSIONS = ['Day', 'User', 'Status', 'Sub Category', 'Request Type']
+
+# Dimensions the trend chart can break the counts down by
+BREAKDOWNS = ['Status', 'User', 'Sub Category', 'Request Type']
+
+# Status group of the cases with an SR or Incident number, the same as the sidebar's status filter
+PENDING = 'Pending SR/Incident'
+
+# Values of a breakdown shown on their own, the rest are summed as Other
+TOP_VALUES = 8
+
+
+class CaseCube:
+    """Case counts per start day, user, status group, sub-category and request type.
+
+    The counts are built with one vectorized groupby over the cases, once
+    per version of the data, and the trend and heatmap charts only read
+    them, never the case rows.
+    """
+
+    def __init__(self, df=None):
+        counts = pd.DataFrame(columns=CUBE_DIMENSIONS + ['Cases']) if df is None else _group(df)
+        self.counts = _compact(_regroup(counts))
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Return a cube over counts already grouped by CUBE_DIMENSIONS, as read from a database"""
+        cube = cls()
+        cube.counts = _compact(_regroup(counts))
+        return cube
+
+    def select(self, users=None, status='All', date_range=None):
+        """Return the counts of the given users, status group and inclusive date range"""
+        counts = self.counts
+        keep = np.ones(len(counts), dtype=bool)
+        if users is not None:
+            keep &= counts['User'].isin(users).to_numpy()
+        if status != 'All':
+            keep &= (counts['Status'] == status).to_numpy()
+        if date_range is not None and len(date_range) == 2:
+            days = counts['Day'].to_numpy()
+            keep &= (days >= day_numbers(date_range[0])) & (days <= day_numbers(date_range[1]))
+        return counts[keep]
+
+    def trend(self, by, users=None, status='All', date_range=None, cumulative=False):
+        """Return the cases per start day, one column per value of ``by``, every day of the range present.
+
+        The TOP_VALUES largest values get their own column, the others are
+        summed as Other. With ``cumulative`` each day holds the open
+        backlog on that day: the cases of the export started on or before
+        it, including those started before the range. An export only
+        lists open cases, so cases closed since are not in it.
+        """
+        bounded = date_range is not None and len(date_range) == 2
+        if bounded:
+            first, last = day_numbers(date_range[0]), day_numbers(date_range[1])
+        counts = self.select(users, status, date_range)
+        if bounded and cumulative:
+            earlier = self.select(users, status)
+            counts = pd.concat([earlier[earlier['Day'].to_numpy() < first], counts])
+        table = counts.pivot_table(index='Day', columns=by, values='Cases', aggfunc='sum', fill_value=0,
+                                   observed=True)
+        if len(table.columns) > TOP_VALUES:
+            top = table.sum().nlargest(TOP_VALUES).index
+            table = table[top].assign(Other=table.drop(columns=top).sum(axis=1))
+
+        if not bounded:
+            first, last = (table.index.min(), table.index.max()) if len(table) else (0, -1)
+        start = min(first, table.index.min()) if cumulative and len(table) else first
+        table = table.reindex(np.arange(start, last + 1), fill_value=0)
+        if cumulative:
+            table = table.cumsum().iloc[first - start:]
+        table.index = pd.to_datetime(table.index.to_numpy().astype('datetime64[D]'))
+        table.index.name = 'Date'
+        table.columns = table.columns.astype(str)
+        return table
+
+    def heatmap(self, rows, users=None, status='All', date_range=None, period='W'):
+        """Return the cases per value of ``rows`` and week (``period='W'``) or month ('M'), in long form"""
+        counts = self.select(users, status, date_range)
+        dates = pd.to_datetime(counts['Day'].to_numpy().astype('datetime64[D]'))
+        periods = dates.to_period(period).start_time
+        table = (counts.assign(Period=periods).groupby([rows, 'Period'], observed=True)['Cases'].sum()
+                 .reset_index())
+        table[rows] = table[rows].astype(str)
+        return table
+
+
+def _group(df):
+    """Count case rows per CUBE_DIMENSIONS"""
+    status = pd.Categorical(np.where(df['Status'].to_numpy() == NOT_TRIAGED, NOT_TRIAGED, PENDING))
+    keys = pd.DataFrame({
+        'Day': df[DAY_COLUMN].array,
+        'User': df['Current User Id'].array,
+        'Status': status,
+        'Sub Category': df['Sub Category'].array,
+        'Request Type': df['Request Type'].array
+    })
+    return keys.groupby(CUBE_DIMENSIONS, observed=True, sort=False, dropna=False).size().reset_index(name='Cases')
+
+
+def _regroup(counts):
+    """Sum counts sharing the same keys, sorted by day"""
+    return counts.groupby(CUBE_DIMENSIONS, sort=True, observed=True, dropna=False)['Cases'].sum().reset_index()
+
+
+def _compact(counts):
+    """Store the day and count as integers and the text dimensions as categories"""
+    return counts.astype({'Day': np.int32, 'Cases': np.int64, **{dim: 'category' for dim in CUBE_DIMENSIONS[1:]}})
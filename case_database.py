@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from case_categorizer import DIT_TEAM, NOT_TRIAGED, enrich_cases
+from case_cube import CUBE_DIMENSIONS, PENDING, CaseCube
+from case_export import export_cases
+from case_loader import DATE_COLUMNS, DAY_COLUMN, day_numbers, file_content_hash, load_case_snapshot
+from case_rollup import ROLLUP_COLUMNS
+from case_text import UNRECOVERABLE_COLUMN
+
+# Suffix of the SQLite database written next to a source CSV
+DATABASE_SUFFIX = '.cases.sqlite'
+
+# Bumped whenever the tables or indexes of the database change
+DATABASE_VERSION = '4'
+
+# Columns the dashboard filters and groups on, each gets an index
+INDEXED_COLUMNS = ['Current User Id', DAY_COLUMN, 'Status', 'SR/Incident Number']
+
+# Rows inserted or exported per batch
+BATCH_SIZE = 50000
+
+
+def database_path(csv_path):
+    """Return the path of the SQLite database kept next to a source CSV"""
+    return os.path.splitext(csv_path)[0] + DATABASE_SUFFIX
+
+
+class CaseDatabase:
+    """SQLite copy of a categorized case export answering the dashboard queries.
+
+    The sidebar filters, the SR/Incident rollup, the case pages and the CSV
+    export are all SQL queries over the indexed ``cases`` table, so only the
+    rows shown are read into pandas. Has the same methods as
+    case_queries.FrameCaseQueries. A connection is opened per query, as
+    Streamlit runs sessions on several threads.
+    """
+
+    def __init__(self, path, team_users):
+        self.path = path
+        self.team_users = list(team_users)
+
+    @classmethod
+    def open(cls, csv_path, team_users, progress=None):
+        """Open the database of a CSV, building it first when it is missing or stale.
+
+        The cases are stored enriched for ``team_users``, the database is
+        rebuilt when the CSV content or the team changes. Returns None when the
+        CSV cannot be parsed.
+        """
+        database = cls(database_path(csv_path), team_users)
+        file_hash = file_content_hash(csv_path)
+        metadata = database.metadata()
+        if metadata.get('source_hash') != file_hash or metadata.get('team_users') != json.dumps(database.team_users):
+            df = load_case_snapshot(csv_path, progress=progress)
+            if df is None:
+                return None
+            database.write(enrich_cases(df, database.team_users), file_hash)
+        elif progress:
+            progress(1.0)
+        return database
+
+    def metadata(self):
+        """Return the database's metadata, empty when it is missing or from another version"""
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with self._connect() as connection:
+                metadata = dict(connection.execute('SELECT key, value FROM metadata'))
+        except sqlite3.Error:
+            return {}
+        return metadata if metadata.get('version') == DATABASE_VERSION else {}
+
+    def write(self, df, file_hash):
+        """Write a categorized case frame into a fresh database, replacing the current one when done"""
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        columns = list(df.columns)
+        connection = sqlite3.connect(tmp_path)
+        try:
+            connection.execute(f'CREATE TABLE cases ({", ".join(_quote(col) for col in columns)})')
+            insert = f'INSERT INTO cases VALUES ({", ".join("?" * len(columns))})'
+            for start in range(0, len(df), BATCH_SIZE):
+                connection.executemany(insert, _sql_rows(df.iloc[start:start + BATCH_SIZE]))
+            for col in INDEXED_COLUMNS:
+                if col in columns:
+                    connection.execute(f'CREATE INDEX {_quote("idx " + col)} ON cases ({_quote(col)})')
+            connection.execute('CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT)')
+            connection.executemany('INSERT INTO metadata VALUES (?, ?)', [
+                ('version', DATABASE_VERSION), ('source_hash', file_hash), ('columns', json.dumps(columns)),
+                ('team_users', json.dumps(self.team_users))])
+            connection.commit()
+        finally:
+            connection.close()
+        os.replace(tmp_path, self.path)
+
+    @property
+    def date_bounds(self):
+        """Return the earliest and latest start date as datetime.date"""
+        with self._connect() as connection:
+            first, last = connection.execute(
+                f'SELECT MIN({_quote(DAY_COLUMN)}), MAX({_quote(DAY_COLUMN)}) FROM cases').fetchone()
+        return tuple(np.array([first, last], dtype='datetime64[D]').tolist())
+
+    def counts(self, user, status, date_range):
+        """Return the number of matching cases and how many of them are not triaged"""
+        where, params = self._where(user, status, date_range)
+        with self._connect() as connection:
+            total, not_triaged = connection.execute(
+                f'SELECT COUNT(*), TOTAL("Status" = ?) FROM cases WHERE {where}', [NOT_TRIAGED] + params).fetchone()
+        return int(total), int(not_triaged)
+
+    def rollup(self, user, status, date_range):
+        """Return the SR/Incident rollup of the matching cases, grouped in SQL"""
+        where, params = self._where(user, status, date_range)
+        query = f'''
+            SELECT "SR/Incident Number", COUNT(*) AS cases, json_group_array(DISTINCT "Current User Id"),
+                   MIN("Case Start Date"), json_group_array(DISTINCT "Sub Category"), json_group_array("Case Id")
+            FROM (SELECT * FROM cases WHERE {where} AND "SR/Incident Number" != '' ORDER BY rowid)
+            GROUP BY "SR/Incident Number"
+            ORDER BY cases DESC, "SR/Incident Number"
+        '''
+        with self._connect() as connection:
+            rows = connection.execute(query, params).fetchall()
+        return pd.DataFrame({
+            'SR/Incident Number': [row[0] for row in rows],
+            'Number of Cases': pd.array([row[1] for row in rows], dtype='int64'),
+            'Assigned To': [', '.join(sorted(json.loads(row[2]))) for row in rows],
+            'First Case Date': pd.to_datetime([row[3] for row in rows]),
+            'Categories': [', '.join(sorted(json.loads(row[4]))) for row in rows],
+            'Case Ids': [json.loads(row[5]) for row in rows]
+        }, columns=ROLLUP_COLUMNS)
+
+    def cases(self, user, status, date_range, columns, reference=None, offset=0, limit=None):
+        """Return the matching cases newest first, optionally only those linked to one reference"""
+        where, params = self._where(user, status, date_range)
+        if reference is not None:
+            where += ' AND "SR/Incident Number" = ?'
+            params.append(reference)
+        query = (f'SELECT {", ".join(_quote(col) for col in columns)} FROM cases WHERE {where} '
+                 f'ORDER BY {_quote(DAY_COLUMN)} DESC, rowid LIMIT ? OFFSET ?')
+        with self._connect() as connection:
+            return self._frame(pd.read_sql_query(query, connection, params=params + [
+                -1 if limit is None else limit, offset]))
+
+    def case_cube(self):
+        """Return the case counts per day, user, status group, sub-category and request type, grouped in SQL"""
+        query = f'''
+            SELECT {_quote(DAY_COLUMN)}, "Current User Id", CASE WHEN "Status" = ? THEN ? ELSE ? END,
+                   "Sub Category", "Request Type", COUNT(*)
+            FROM cases GROUP BY 1, 2, 3, 4, 5
+        '''
+        with self._connect() as connection:
+            rows = connection.execute(query, [NOT_TRIAGED, NOT_TRIAGED, PENDING]).fetchall()
+        return CaseCube.from_counts(pd.DataFrame(rows, columns=CUBE_DIMENSIONS + ['Cases']))
+
+    def export_batches(self, user, status, date_range):
+        """Yield the matching cases in file order, read from the database in batches of rows"""
+        where, params = self._where(user, status, date_range)
+        with self._connect() as connection:
+            batches = pd.read_sql_query(f'SELECT * FROM cases WHERE {where} ORDER BY rowid', connection,
+                                        params=params, chunksize=BATCH_SIZE)
+            empty = True
+            for batch in batches:
+                empty = False
+                yield self._frame(batch)
+            if empty:
+                yield pd.DataFrame(columns=json.loads(self.metadata().get('columns', '[]')))
+
+    def export_csv(self, user, status, date_range):
+        """Return the matching cases as UTF-8 CSV bytes with a BOM, streamed from the database in batches"""
+        return export_cases(self.export_batches(user, status, date_range), 'CSV')
+
+    def _where(self, user, status, date_range):
+        """Return the WHERE clause and parameters for the sidebar filters"""
+        clauses, params = ['1 = 1'], []
+        if user == DIT_TEAM:
+            clauses.append(f'"Current User Id" IN ({", ".join("?" * len(self.team_users)) or "NULL"})')
+            params.extend(self.team_users)
+        elif user is not None:
+            clauses.append('"Current User Id" = ?')
+            params.append(user)
+        if status == 'Not Triaged':
+            clauses.append('"Status" = ?')
+            params.append(NOT_TRIAGED)
+        elif status == 'Pending SR/Incident':
+            clauses.append('"Status" != ?')
+            params.append(NOT_TRIAGED)
+        if date_range is not None and len(date_range) == 2:
+            clauses.append(f'{_quote(DAY_COLUMN)} BETWEEN ? AND ?')
+            params.extend([int(day_numbers(date_range[0])), int(day_numbers(date_range[1]))])
+        return ' AND '.join(clauses), params
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection to the database for one query and close it afterwards"""
+        connection = sqlite3.connect(self.path)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _frame(df):
+        """Restore the date and flag columns of rows read back from the database"""
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col])
+        if UNRECOVERABLE_COLUMN in df.columns:
+            df[UNRECOVERABLE_COLUMN] = df[UNRECOVERABLE_COLUMN].astype(bool)
+        return df
+
+
+def _quote(name):
+    """Quote a column name for SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_rows(df):
+    """Return a frame's rows as tuples of SQLite values, dates as ISO text"""
+    columns = []
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime('%Y-%m-%d %H:%M:%S')
+        elif pd.api.types.is_integer_dtype(values):
+            values = values.astype('int64')
+        values = values.astype(object).where(values.notna(), None)
+        columns.append(values.tolist())
+    return zip(*columns)
@@ -0,0 +1,141 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from case_categorizer import categorize_notes
+from case_loader import (file_content_hash, load_case_snapshot, load_cases, read_parquet_with_metadata,
+                         write_parquet_with_metadata)
+from case_timing import TIMINGS
+
+# Merged case store kept in the folder the daily exports are dropped into
+STORE_FILE = 'case_store.parquet'
+
+# Bumped whenever the columns or dtypes stored in the merged store change
+STORE_VERSION = '4'
+
+# Column identifying a case across exports
+KEY_COLUMN = 'Case Id'
+
+# Columns whose change means a case has to be categorized again
+CHANGE_COLUMNS = ['Last Note Date', 'Last Note']
+
+# Columns derived by categorize_notes
+CATEGORIZED_COLUMNS = ['Status', 'SR/Incident Number']
+
+# Delta key set instead of the counts when an export is older than the one last merged into the store
+OLDER_THAN_STORE = 'older_than_store'
+
+
+def store_path(csv_path):
+    """Return the path of the merged store for the folder holding a daily export"""
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), STORE_FILE)
+
+
+def ingest_export(csv_path, team_users=(), progress=None, path=None):
+    """Merge a daily case export into the store and return (cases, delta counts).
+
+    Rows are keyed on Case Id. Cases that are new, or whose Last Note Date or
+    Last Note changed since the previous export, are categorized; the other
+    cases keep their stored Status and SR/Incident Number. Cases missing
+    from the export are dropped. The merged frame is written back to the
+    store together with the export's path, content hash and the delta
+    counts, so loading the same export again only reads the store. Returns (None, None)
+    when the CSV cannot be parsed.
+
+    The store follows the newest export of its folder. An export last
+    modified before the one merged into the store is loaded on its own
+    through its snapshot, without touching the store, and its delta only
+    holds OLDER_THAN_STORE with the name of the newer export.
+    """
+    path = path or store_path(csv_path)
+    file_hash = file_content_hash(csv_path)
+    modified = os.stat(csv_path).st_mtime_ns
+    previous, metadata = read_parquet_with_metadata(path, {'gpssa_store_version': STORE_VERSION})
+    same_source = metadata.get('gpssa_source_path') == os.path.abspath(csv_path) if previous is not None else False
+    if same_source and metadata.get('gpssa_source_hash') == file_hash:
+        if progress:
+            progress(1.0)
+        return previous, json.loads(metadata.get('gpssa_delta', '{}'))
+    if previous is not None and modified < int(metadata.get('gpssa_source_mtime', 0)):
+        df = load_case_snapshot(csv_path, progress=progress)
+        if df is None:
+            return None, None
+        return df, {OLDER_THAN_STORE: os.path.basename(metadata.get('gpssa_source_path', ''))}
+
+    current = load_cases(csv_path, progress=progress)
+    if current is None:
+        return None, None
+
+    matched, stale, removed = diff_cases(previous, current)
+    merged = merge_cases(current, matched, stale)
+    counts = delta_counts(current, merged, matched, stale, removed, team_users)
+    write_parquet_with_metadata(merged, path, {
+        'gpssa_source_hash': file_hash,
+        'gpssa_store_version': STORE_VERSION,
+        'gpssa_source_path': os.path.abspath(csv_path),
+        'gpssa_source_mtime': str(modified),
+        'gpssa_delta': json.dumps(counts)
+    })
+    return merged, counts
+
+
+def diff_cases(previous, current):
+    """Compare the current export with the previous store.
+
+    Returns the previous rows aligned to the current rows by Case Id (all
+    missing for new cases), a boolean array of the current rows that are new
+    or changed, and the Case Ids that are no longer in the export.
+    """
+    if previous is None or KEY_COLUMN not in previous.columns:
+        matched = pd.DataFrame(index=current.index, columns=[KEY_COLUMN, 'Current User Id'] + CHANGE_COLUMNS
+                               + CATEGORIZED_COLUMNS, dtype=object)
+        return matched, np.ones(len(current), dtype=bool), np.array([], dtype=object)
+
+    previous = previous.drop_duplicates(KEY_COLUMN, keep='last').set_index(KEY_COLUMN, drop=False)
+    ids = current[KEY_COLUMN].to_numpy()
+    matched = previous.reindex(ids).set_axis(current.index)
+
+    stale = matched[KEY_COLUMN].isna().to_numpy()
+    for col in CHANGE_COLUMNS:
+        before, after = matched[col], current[col]
+        stale = stale | ~((before == after) | (before.isna() & after.isna())).to_numpy()
+
+    removed = previous.index[~previous.index.isin(ids)].to_numpy()
+    return matched, stale, removed
+
+
+def merge_cases(current, matched, stale):
+    """Return the current rows with Status and SR/Incident Number, categorizing only the stale rows"""
+    categorized = matched[CATEGORIZED_COLUMNS].astype(object)
+    if stale.any():
+        with TIMINGS.stage('categorize'):
+            fresh = categorize_notes(current.loc[stale, 'Last Note'])
+        categorized.loc[stale, CATEGORIZED_COLUMNS] = fresh.astype(object).to_numpy()
+    return current.assign(**{
+        'Status': categorized['Status'].astype('category'),
+        'SR/Incident Number': categorized['SR/Incident Number']
+    })
+
+
+def delta_counts(current, merged, matched, stale, removed, team_users=()):
+    """Count the new, changed, removed and unchanged cases of an ingest.
+
+    ``team_assigned`` counts cases now assigned to one of ``team_users``
+    that were not before, and ``new_sr_links`` counts cases whose
+    SR/Incident Number is set and differs from the previous one; both
+    include new cases.
+    """
+    new = matched[KEY_COLUMN].isna().to_numpy()
+    in_team = current['Current User Id'].isin(team_users).to_numpy()
+    was_in_team = matched['Current User Id'].isin(team_users).to_numpy()
+    reference = merged['SR/Incident Number'].to_numpy(dtype=object)
+    previous_reference = matched['SR/Incident Number'].fillna('').to_numpy(dtype=object)
+    counts = {
+        'new': new.sum(),
+        'changed': (stale & ~new).sum(),
+        'removed': len(removed),
+        'unchanged': (~stale).sum(),
+        'team_assigned': (in_team & ~was_in_team).sum(),
+        'new_sr_links': ((reference != '') & (reference != previous_reference)).sum()
+    }
+    return {key: int(value) for key, value in counts.items()}
@@ -0,0 +1,134 @@
+import gzip
+import importlib.util
+import io
+from case_loader import DAY_COLUMN
+
+# Export formats offered for download: label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('.csv', 'text/csv'),
+    'CSV (gzip)': ('.csv.gz', 'application/gzip'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'Excel': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+}
+
+# Rows sliced from a frame per batch when it is exported
+BATCH_SIZE = 50000
+
+# Rows per worksheet in Excel, cases beyond it continue on another sheet
+EXCEL_MAX_ROWS = 1048576
+
+
+def available_export_formats():
+    """Return the export formats whose writer can run here, Excel needs the optional xlsxwriter package"""
+    return [label for label in EXPORT_FORMATS
+            if label != 'Excel' or importlib.util.find_spec('xlsxwriter') is not None]
+
+
+def frame_batches(df, positions=None, batch_size=BATCH_SIZE):
+    """Yield a frame in row slices, at least one so the writers see the columns.
+
+    With ``positions`` only those rows are yielded, taken from the frame
+    one batch at a time instead of copying them all first.
+    """
+    rows = len(df) if positions is None else len(positions)
+    for start in range(0, max(rows, 1), batch_size):
+        batch = slice(start, start + batch_size)
+        yield df.iloc[batch if positions is None else positions[batch]]
+
+
+def export_cases(batches, export_format, rollup=None):
+    """Write batches of cases in one of the EXPORT_FORMATS and return the file's bytes.
+
+    The batches are written one at a time, so the export never holds a
+    second full copy of the cases. Excel exports get a second sheet with
+    the SR/Incident ``rollup`` when one is given. The loader's internal start
+    day column is left out.
+    """
+    batches = (batch.drop(columns=DAY_COLUMN, errors='ignore') for batch in batches)
+    output = io.BytesIO()
+    if export_format == 'CSV':
+        write_csv(batches, output)
+    elif export_format == 'CSV (gzip)':
+        write_csv(batches, output, compress=True)
+    elif export_format == 'Parquet':
+        write_parquet(batches, output)
+    elif export_format == 'Excel':
+        write_excel(batches, output, rollup)
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+    return output.getvalue()
+
+
+def write_csv(batches, output, compress=False):
+    """Write batches as UTF-8 CSV with a BOM, for Excel, optionally gzip compressed"""
+    stream = gzip.GzipFile(fileobj=output, mode='wb', mtime=0) if compress else output
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    header = True
+    for batch in batches:
+        batch.to_csv(text, index=False, header=header)
+        header = False
+    text.flush()
+    text.detach()
+    if compress:
+        stream.close()
+
+
+def write_parquet(batches, output):
+    """Write batches as one Parquet file, a row group per batch"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    for batch in batches:
+        table = pa.Table.from_pandas(batch, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(output, table.schema, compression='zstd')
+        else:
+            table = table.cast(writer.schema)
+        writer.write_table(table)
+    writer.close()
+
+
+def write_excel(batches, output, rollup=None):
+    """Write batches to a Cases sheet and the rollup to an SR/Incident Rollup sheet.
+
+    xlsxwriter's constant memory mode flushes each row to a temporary file
+    as soon as it is written, so large exports are not held as cell objects.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd',
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+        'nan_inf_to_errors': True
+    })
+    sheets = 0
+    sheet, row, columns = None, EXCEL_MAX_ROWS, []
+    for batch in batches:
+        columns = list(batch.columns)
+        for values in _excel_rows(batch):
+            if row == EXCEL_MAX_ROWS:
+                sheets += 1
+                sheet = workbook.add_worksheet('Cases' if sheets == 1 else f'Cases {sheets}')
+                sheet.write_row(0, 0, columns)
+                row = 1
+            sheet.write_row(row, 0, values)
+            row += 1
+    if sheet is None:
+        workbook.add_worksheet('Cases').write_row(0, 0, columns)
+
+    if rollup is not None:
+        rollup = rollup.assign(**{'Case Ids': rollup['Case Ids'].map(lambda ids: ', '.join(map(str, ids)))})
+        sheet = workbook.add_worksheet('SR Incident Rollup')
+        sheet.write_row(0, 0, list(rollup.columns))
+        for row, values in enumerate(_excel_rows(rollup), start=1):
+            sheet.write_row(row, 0, values)
+    workbook.close()
+
+
+def _excel_rows(df):
+    """Return a frame's rows as tuples of plain Python values, missing values as None"""
+    values = df.astype(object).where(df.notna(), None)
+    return values.itertuples(index=False, name=None)
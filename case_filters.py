@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from case_categorizer import DIT_TEAM, NOT_TRIAGED
+from case_loader import DAY_COLUMN, day_numbers
+
+# Status filter options shown in the dashboards' sidebar
+STATUS_OPTIONS = ['All', 'Not Triaged', 'Pending SR/Incident']
+
+
+class CaseFilterIndex:
+    """Precomputed lookups for the user, status and date range sidebar filters.
+
+    Row positions are grouped per user and per status once, and the start
+    day numbers are kept sorted, so any filter combination resolves by
+    combining bitmaps and an integer binary search instead of comparing
+    every row of the frame.
+    """
+
+    def __init__(self, df, team_users):
+        self.size = len(df)
+
+        # Row positions per user, the DIT-Team rows are the union of its members
+        codes, users = pd.factorize(df['Current User Id'])
+        order = np.argsort(codes, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(users)))])
+        order = order[np.sum(codes < 0):]
+        self._user_rows = {user: order[bounds[i]:bounds[i + 1]] for i, user in enumerate(users)}
+        self._user_rows[DIT_TEAM] = np.sort(np.concatenate(
+            [self._user_rows.get(user, np.array([], dtype=int)) for user in team_users]))
+        self._user_bitmaps = {}
+
+        # Bitmaps per status option
+        not_triaged = (df['Status'] == NOT_TRIAGED).to_numpy()
+        self._status_bitmaps = {'Not Triaged': not_triaged, 'Pending SR/Incident': ~not_triaged}
+
+        # Start day numbers, sorted for binary search
+        days = df[DAY_COLUMN].to_numpy() if DAY_COLUMN in df.columns else day_numbers(df['Case Start Date'])
+        self._date_order = np.argsort(days, kind='stable')
+        self._sorted_days = days[self._date_order]
+
+    @property
+    def date_bounds(self):
+        """Return the earliest and latest start date as datetime.date"""
+        return tuple(np.array([self._sorted_days[0], self._sorted_days[-1]], dtype='datetime64[D]').tolist())
+
+    def mask(self, user=None, status='All', date_range=None):
+        """Return a boolean array over all rows matching the selected filters"""
+        mask = self._user_bitmap(user).copy() if user is not None else np.ones(self.size, dtype=bool)
+        if status in self._status_bitmaps:
+            mask = mask & self._status_bitmaps[status]
+        if date_range is not None and len(date_range) == 2:
+            mask = mask & self._date_bitmap(*date_range)
+        return mask
+
+    def status_bitmap(self, status):
+        """Return the precomputed bitmap of a status option, shared read-only"""
+        return self._status_bitmaps[status]
+
+    def _user_bitmap(self, user):
+        """Return the bitmap of a user's rows, building it on first use"""
+        if user not in self._user_bitmaps:
+            bitmap = np.zeros(self.size, dtype=bool)
+            bitmap[self._user_rows.get(user, [])] = True
+            self._user_bitmaps[user] = bitmap
+        return self._user_bitmaps[user]
+
+    def _date_bitmap(self, start_date, end_date):
+        """Return the bitmap of rows starting within the inclusive date range"""
+        lo = np.searchsorted(self._sorted_days, day_numbers(start_date), side='left')
+        hi = np.searchsorted(self._sorted_days, day_numbers(end_date), side='right')
+        bitmap = np.zeros(self.size, dtype=bool)
+        bitmap[self._date_order[lo:hi]] = True
+        return bitmap
@@ -0,0 +1,561 @@
+import codecs
+import glob
+import hashlib
+import io
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from case_categorizer import categorize_notes
+from case_text import UNRECOVERABLE_COLUMN, repair_notes
+from case_timing import TIMINGS
+
+# Block size used when hashing files from disk
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Number of CSV rows parsed at a time by load_cases
+CHUNK_SIZE = 50000
+
+# Encodings tried in order when the detected encoding fails
+FALLBACK_ENCODINGS = ['utf-8-sig', 'windows-1256', 'iso-8859-6', 'cp1256', 'utf-8']
+
+# Arabic code pages tried when chardet has no usable guess
+ARABIC_ENCODINGS = ['windows-1256', 'iso-8859-6', 'cp1256']
+
+# Size of each of the head, middle and tail blocks sampled for encoding detection
+SAMPLE_BLOCK_SIZE = 64 * 1024
+
+# Byte order marks checked before any other detection
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+]
+
+# Local cache directory for data derived from the case exports
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'gpssa')
+
+# Detected encodings and content hashes, keyed by path, size and mtime
+ENCODING_CACHE_FILE = os.path.join(CACHE_DIR, 'encodings.json')
+HASH_CACHE_FILE = os.path.join(CACHE_DIR, 'hashes.json')
+
+# Suffix of the Parquet snapshot written next to a source CSV
+SNAPSHOT_SUFFIX = '.snapshot.parquet'
+
+# Bumped whenever the columns or dtypes stored in snapshots change
+SNAPSHOT_VERSION = '5'
+
+# Date columns in the case exports, stored as day/month/year
+DATE_COLUMNS = ['Case Start Date', 'Last Note Date']
+DATE_FORMAT = '%d/%m/%Y'
+
+# Integer day number of Case Start Date (days since 1970-01-01), used to filter and sort by date
+DAY_COLUMN = 'Case Start Day'
+
+# Distinct date strings kept parsed, the cache is emptied when it grows past this
+DATE_CACHE_SIZE = 100000
+
+# Low-cardinality text columns stored as pandas categories
+CATEGORY_COLUMNS = ['Request Type', 'Sub Category', 'Last Admin', 'Current User Id']
+
+# Folders the dashboards may pick case exports from, separated by os.pathsep
+DATA_DIRS = os.environ.get('GPSSA_DATA_DIRS', '')
+
+# In-memory copies of the JSON cache files, loaded on first use
+_json_caches = {}
+
+# Parsed dates keyed by (format, date string), shared by every chunk and file loaded in this process
+_parsed_dates = {}
+
+
+def file_content_hash(source, refresh=False):
+    """Return a hex digest of a case export's content.
+
+    ``source`` can be a file path, a Streamlit uploaded file or an open binary
+    file. Hashes of files on disk are remembered per (path, size, mtime) in
+    HASH_CACHE_FILE, so the file is only read again when it changes. With
+    ``refresh`` the file is hashed again even if its size and mtime did not
+    change, and the remembered hash is replaced.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return _cached_file_info(HASH_CACHE_FILE, source, _hash_stream, refresh=refresh)
+
+    if hasattr(source, 'getbuffer'):
+        return hashlib.md5(source.getbuffer()).hexdigest()
+
+    source.seek(0)
+    digest = _hash_stream(source)
+    source.seek(0)
+    return digest
+
+
+def files_content_hash(sources):
+    """Return one hex digest over the content of several case exports, in order"""
+    digest = hashlib.md5()
+    for source in sources:
+        digest.update(file_content_hash(source).encode())
+    return digest.hexdigest()
+
+
+def _hash_stream(f):
+    """Hash an open binary file block by block"""
+    digest = hashlib.md5()
+    for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def detect_encoding(f):
+    """Detect the encoding of an open binary file from a bounded sample.
+
+    Only the head, middle and tail blocks are read. A BOM or a clean utf-8
+    decode settles it without chardet, otherwise chardet's guess is used if it
+    decodes the sample, then the Arabic code pages.
+    """
+    sample = _read_sample(f)
+
+    for bom, encoding in _BOMS:
+        if sample[0].startswith(bom):
+            return encoding
+
+    if all(_is_utf8_block(block) for block in sample):
+        return 'utf-8'
+
+    # chardet is only imported when it is needed, it adds to the dashboards' startup time
+    import chardet
+
+    data = b''.join(sample)
+    detected = chardet.detect(data)['encoding']
+    for encoding in [detected] + ARABIC_ENCODINGS:
+        if encoding and _decodes(data, encoding):
+            return encoding
+    return None
+
+
+def detect_file_encoding(path):
+    """Detect the encoding of a file on disk, cached per (path, size, mtime).
+
+    Results are kept in memory and in ENCODING_CACHE_FILE, so reopening the
+    same export, even from a new process, skips detection.
+    """
+    return _cached_file_info(ENCODING_CACHE_FILE, path, detect_encoding)
+
+
+def _cached_file_info(cache_file, path, compute, refresh=False):
+    """Return compute(open file) for a file on disk, cached per (path, size, mtime) unless ``refresh``"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = f"{path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    cache = _load_json_cache(cache_file)
+    if refresh or key not in cache:
+        # Forget values computed for older versions of this file
+        for old_key in [k for k in cache if k.startswith(f"{path}|")]:
+            del cache[old_key]
+        with open(path, 'rb') as f:
+            cache[key] = compute(f)
+        _save_json_cache(cache_file, cache)
+    return cache[key]
+
+
+def _read_sample(f):
+    """Read the head, middle and tail blocks of an open binary file"""
+    size = _stream_size(f)
+    if size <= 3 * SAMPLE_BLOCK_SIZE:
+        f.seek(0)
+        blocks = [f.read()]
+    else:
+        blocks = []
+        for offset in (0, (size - SAMPLE_BLOCK_SIZE) // 2, size - SAMPLE_BLOCK_SIZE):
+            f.seek(offset)
+            blocks.append(f.read(SAMPLE_BLOCK_SIZE))
+    f.seek(0)
+    return blocks
+
+
+def _is_utf8_block(block):
+    """Check a sample block is utf-8, allowing characters cut at the block edges"""
+    # Skip continuation bytes of a character that started before the block
+    start = 0
+    while start < min(len(block), 3) and 0x80 <= block[start] <= 0xBF:
+        start += 1
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(block[start:], final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _decodes(data, encoding):
+    """Check the sample decodes cleanly with the given encoding"""
+    try:
+        data.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+
+def _load_json_cache(cache_file):
+    """Return the contents of a JSON cache file, reading it from disk on first use"""
+    if cache_file not in _json_caches:
+        try:
+            with open(cache_file, encoding='utf-8') as f:
+                _json_caches[cache_file] = json.load(f)
+        except (OSError, ValueError):
+            _json_caches[cache_file] = {}
+    return _json_caches[cache_file]
+
+
+def _save_json_cache(cache_file, cache):
+    """Write a JSON cache file to disk, ignoring unwritable locations"""
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # Several loader processes can save at once, each writes its own file and swaps it in
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+
+def load_cases(source, chunksize=CHUNK_SIZE, progress=None):
+    """Load and preprocess a case export in fixed-size chunks.
+
+    ``source`` is a file path or an open binary file. Each chunk has its dates
+    parsed, rows without a Case Start Date dropped, text gaps filled, notes
+    re-decoded and dtypes compacted before the next chunk is read, so only
+    the cleaned chunks are kept in memory. ``progress`` is called with the
+    fraction of the file read so far. Returns None when the file cannot be
+    parsed with any encoding.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with TIMINGS.stage('encoding_detection'):
+            try:
+                encoding = detect_file_encoding(source)
+            except Exception:
+                encoding = None
+        with open(source, 'rb') as f, TIMINGS.stage('decode'):
+            return _load_stream(f, encoding, chunksize, progress)
+
+    with TIMINGS.stage('encoding_detection'):
+        try:
+            encoding = detect_encoding(source)
+        except Exception:
+            encoding = None
+    with TIMINGS.stage('decode'):
+        return _load_stream(source, encoding, chunksize, progress)
+
+
+def _load_stream(source, detected_encoding, chunksize, progress):
+    """Parse an open binary file chunk by chunk, trying the detected encoding first"""
+    total_size = _stream_size(source)
+    encodings = [detected_encoding] + FALLBACK_ENCODINGS
+
+    for encoding in dict.fromkeys(e for e in encodings if e):
+        source.seek(0)
+        chunks = []
+        try:
+            for chunk in pd.read_csv(source, encoding=encoding, chunksize=chunksize):
+                chunks.append(compact_dtypes(_clean_chunk(chunk)))
+                if progress and total_size:
+                    progress(min(source.tell() / total_size, 1.0))
+        except Exception:
+            continue
+        break
+    else:
+        return None
+
+    if progress:
+        progress(1.0)
+    if not chunks:
+        return None
+    return _concat_chunks(chunks)
+
+
+def compact_dtypes(df):
+    """Store the low-cardinality text columns as categories and Case Id as the smallest integer type"""
+    df = df.astype({col: 'category' for col in CATEGORY_COLUMNS if col in df.columns})
+    if 'Case Id' in df.columns and pd.api.types.is_integer_dtype(df['Case Id']):
+        df['Case Id'] = pd.to_numeric(df['Case Id'], downcast='integer')
+    return df
+
+
+def memory_report(df):
+    """Return the frame's memory in bytes as plain object columns and as stored"""
+    after = df.memory_usage(deep=True).sum()
+    before = df.index.memory_usage()
+    for col in df.columns:
+        column = df[col]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype(object)
+        elif pd.api.types.is_integer_dtype(column):
+            column = column.astype('int64')
+        before += column.memory_usage(deep=True, index=False)
+    return before, after
+
+
+def _concat_chunks(chunks):
+    """Concatenate cleaned chunks, merging the categories of each category column"""
+    categorical = [col for col in chunks[0].columns
+                   if isinstance(chunks[0][col].dtype, pd.CategoricalDtype)
+                   and all(isinstance(c[col].dtype, pd.CategoricalDtype) for c in chunks)]
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks])
+    for col in categorical:
+        df[col] = pd.Categorical(union_categoricals([chunk[col] for chunk in chunks]))
+    return df[chunks[0].columns]
+
+
+def _stream_size(f):
+    """Return the size in bytes of an open binary file"""
+    if hasattr(f, 'getbuffer'):
+        return f.getbuffer().nbytes
+    try:
+        return os.fstat(f.fileno()).st_size
+    except (AttributeError, OSError):
+        return 0
+
+
+def parse_dates(values, date_format=DATE_FORMAT):
+    """Parse a column of date strings, converting each distinct string only once.
+
+    Exports hold a few hundred distinct dates over many rows, so the column
+    is factorized, only strings not seen before in this process are passed
+    to pd.to_datetime, and the results are mapped back by code. Strings that
+    do not match ``date_format`` become NaT.
+    """
+    codes, uniques = pd.factorize(values)
+    # Loader threads share the cache and may clear it meanwhile, so the lookup only reads this local copy
+    known = {value: _parsed_dates.get((date_format, value)) for value in uniques}
+    missing = [value for value, date in known.items() if date is None]
+    if missing:
+        parsed = pd.to_datetime(pd.Index(missing, dtype=object), format=date_format, errors='coerce')
+        known.update(zip(missing, parsed))
+        if len(_parsed_dates) + len(missing) > DATE_CACHE_SIZE:
+            _parsed_dates.clear()
+        _parsed_dates.update(((date_format, value), date) for value, date in zip(missing, parsed))
+    lookup = pd.DatetimeIndex([known[value] for value in uniques])
+    return pd.Series(lookup.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index, name=values.name)
+
+
+def day_numbers(dates):
+    """Return dates as int32 day numbers (days since 1970-01-01)"""
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int32)
+
+
+def _clean_chunk(chunk):
+    """Normalise dates, text gaps and note encoding in one parsed chunk"""
+    for col in DATE_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = parse_dates(chunk[col])
+
+    # Remove rows with invalid dates
+    chunk = chunk.dropna(subset=['Case Start Date'])
+    chunk[DAY_COLUMN] = day_numbers(chunk['Case Start Date'])
+
+    # Clean up empty text that was read as NaN, dates keep NaT
+    chunk = chunk.fillna({col: '' for col in chunk.columns if col not in DATE_COLUMNS})
+
+    # Repair the notes that were decoded with the wrong code page and flag those that lost their text
+    if 'Last Note' in chunk.columns:
+        chunk['Last Note'], chunk[UNRECOVERABLE_COLUMN] = repair_notes(chunk['Last Note'])
+
+    return chunk
+
+
+def snapshot_path(csv_path):
+    """Return the path of the Parquet snapshot kept next to a source CSV"""
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_SUFFIX
+
+
+def load_case_snapshot(csv_path, progress=None):
+    """Load a categorized case export, preferring its Parquet snapshot.
+
+    The snapshot is used only when it was written from a CSV with the same
+    content hash, otherwise the CSV is parsed with load_cases, categorized
+    and a fresh snapshot is written next to it. Returns None when the CSV
+    cannot be parsed.
+    """
+    file_hash = file_content_hash(csv_path)
+    df = read_snapshot(csv_path, file_hash)
+    if df is not None:
+        if progress:
+            progress(1.0)
+        return df
+
+    df = load_cases(csv_path, progress=progress)
+    if df is None:
+        return None
+    with TIMINGS.stage('categorize'):
+        df = df.join(categorize_notes(df['Last Note']))
+    write_snapshot(df, csv_path, file_hash)
+    return df
+
+
+def expand_sources(pattern):
+    """Return the sorted CSV files in a directory, or the files matching a glob pattern"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.csv')
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def data_directories(default):
+    """Return the folders set in GPSSA_DATA_DIRS that exist, as real paths, or ``default`` when none is set"""
+    directories = DATA_DIRS.split(os.pathsep) if DATA_DIRS else [default]
+    return list(dict.fromkeys(os.path.realpath(d) for d in directories if d and os.path.isdir(d)))
+
+
+def is_within(path, directories):
+    """Return whether a path, after resolving links and '..', lies inside one of the directories"""
+    real_path = os.path.realpath(path)
+    for directory in directories:
+        try:
+            if os.path.commonpath([real_path, directory]) == directory:
+                return True
+        except ValueError:
+            # On another drive, or one path relative and the other absolute
+            continue
+    return False
+
+
+def list_case_files(directory):
+    """Return the CSV files directly inside a folder, most recently modified first"""
+    try:
+        entries = [entry for entry in os.scandir(directory)
+                   if entry.is_file() and entry.name.lower().endswith('.csv')]
+    except OSError:
+        return []
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [entry.path for entry in entries]
+
+
+def load_case_files(sources, workers=None, progress=None):
+    """Load, categorize and merge several case exports using a process pool.
+
+    ``sources`` are file paths or uploaded/open binary files. Each file is
+    decoded, date-parsed and categorized in its own worker process, paths
+    through their Parquet snapshot. A case found in more than one file keeps
+    the row with the latest Last Note Date, the later file winning ties.
+    ``progress`` is called with the fraction of files done. Returns None when
+    no file could be parsed.
+    """
+    jobs = [source if isinstance(source, (str, os.PathLike)) else _read_bytes(source) for source in sources]
+    frames = [None] * len(jobs)
+    if workers == 1 or len(jobs) < 2:
+        for i, job in enumerate(jobs):
+            frames[i] = _load_categorized(job)
+            if progress:
+                progress((i + 1) / len(jobs))
+    else:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        # Spawned workers start clean, a fork of the Streamlit server could inherit locks held by its other threads
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {executor.submit(_load_categorized, job): i for i, job in enumerate(jobs)}
+            for done, future in enumerate(as_completed(futures), 1):
+                frames[futures[future]] = future.result()
+                if progress:
+                    progress(done / len(jobs))
+
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return None
+    return drop_duplicate_cases(_concat_chunks(frames))
+
+
+def drop_duplicate_cases(df):
+    """Keep one row per Case Id, the one with the latest Last Note Date or else the last one"""
+    positions = pd.DataFrame({
+        'id': df['Case Id'].to_numpy(),
+        'date': df['Last Note Date'].to_numpy() if 'Last Note Date' in df.columns else pd.NaT,
+        'position': np.arange(len(df))
+    })
+    latest = (positions.sort_values(['date', 'position'], na_position='first', kind='stable')
+              .drop_duplicates('id', keep='last')['position'])
+    return df.iloc[np.sort(latest.to_numpy())].reset_index(drop=True)
+
+
+def _load_categorized(source):
+    """Load and categorize one export in a worker process, from a path or the raw bytes of an upload"""
+    if isinstance(source, bytes):
+        df = load_cases(io.BytesIO(source))
+        return None if df is None else df.join(categorize_notes(df['Last Note']))
+    return load_case_snapshot(source)
+
+
+def _read_bytes(f):
+    """Return the whole content of an uploaded or open binary file"""
+    if hasattr(f, 'getvalue'):
+        return f.getvalue()
+    f.seek(0)
+    data = f.read()
+    f.seek(0)
+    return data
+
+
+def read_snapshot(csv_path, file_hash):
+    """Memory-map the snapshot of a CSV, or return None if it is missing or stale"""
+    df, _ = read_parquet_with_metadata(snapshot_path(csv_path), {
+        'gpssa_source_hash': file_hash,
+        'gpssa_snapshot_version': SNAPSHOT_VERSION
+    })
+    return df
+
+
+def write_snapshot(df, csv_path, file_hash):
+    """Write a Parquet snapshot of the loaded frame next to its CSV.
+
+    The source content hash and snapshot version are stored in the file's
+    metadata. Failures (pyarrow missing, read-only folder, mixed-type
+    columns) only mean the next load parses the CSV again.
+    """
+    write_parquet_with_metadata(df, snapshot_path(csv_path), {
+        'gpssa_source_hash': file_hash,
+        'gpssa_snapshot_version': SNAPSHOT_VERSION
+    })
+
+
+def read_parquet_with_metadata(path, expected=None):
+    """Memory-map a Parquet file and return it with its ``gpssa_`` metadata.
+
+    The frame is None when the file is missing or unreadable, or when any
+    ``expected`` metadata value differs, in which case the data is not read.
+    """
+    if not os.path.exists(path):
+        return None, {}
+    try:
+        import pyarrow.parquet as pq
+
+        metadata = {key.decode(): value.decode() for key, value in (pq.read_schema(path).metadata or {}).items()
+                    if key.startswith(b'gpssa_')}
+        if any(metadata.get(key) != value for key, value in (expected or {}).items()):
+            return None, metadata
+        return pq.read_table(path, memory_map=True).to_pandas(), metadata
+    except Exception:
+        return None, {}
+
+
+def write_parquet_with_metadata(df, path, metadata):
+    """Write a frame to Parquet with extra string metadata, ignoring any failure"""
+    # Sessions and loader processes can write the same file at once, each writes its own file and swaps it in
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            **{key.encode(): value.encode() for key, value in metadata.items()}
+        })
+        # Write to a temporary file first so readers never see a partial file
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
@@ -0,0 +1,37 @@
+import math
+import streamlit as st
+
+# Default number of table rows sent to the browser per page
+PAGE_SIZE = 100
+
+
+def paginate(df, key, page_size=PAGE_SIZE, label="rows"):
+    """Render page navigation for a frame and return only the rows of the selected page.
+
+    The page number lives in session state under ``key``, so each table keeps
+    its own position across reruns. It is clamped when filters shrink the
+    frame below the stored page.
+    """
+    return paginate_query(len(df), lambda offset, limit: df.iloc[offset:offset + limit], key, page_size, label)
+
+
+def paginate_query(total, fetch, key, page_size=PAGE_SIZE, label="rows"):
+    """Render page navigation for ``total`` rows and return ``fetch(offset, limit)`` for the selected page.
+
+    Used when the rows come from a query, so only the page shown is fetched.
+    """
+    pages = max(1, math.ceil(total / page_size))
+    state_key = f"{key}_page"
+    # The widget's value comes only from session state, seeded on first use and clamped to the pages left
+    st.session_state[state_key] = min(st.session_state.get(state_key, 1), pages)
+
+    nav_col, info_col = st.columns([1, 4])
+    page = nav_col.number_input("Page", min_value=1, max_value=pages, step=1, key=state_key)
+
+    start = (page - 1) * page_size
+    end = min(start + page_size, total)
+    if total:
+        info_col.caption(f"Showing {start + 1:,}–{end:,} of {total:,} {label} (page {page} of {pages})")
+    else:
+        info_col.caption(f"No {label} to show")
+    return fetch(start, end - start)
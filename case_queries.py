@@ -0,0 +1,63 @@
+import numpy as np
+from case_categorizer import NOT_TRIAGED
+from case_cube import CaseCube
+from case_export import export_cases, frame_batches
+from case_loader import DAY_COLUMN
+
+
+class FrameCaseQueries:
+    """Dashboard queries answered from the loaded frame and its precomputed indexes.
+
+    Has the same methods as case_database.CaseDatabase, so a dashboard can
+    run on either. Every query takes the sidebar filters ``user``,
+    ``status`` and ``date_range``, and resolves them through the
+    CaseFilterIndex bitmaps.
+    """
+
+    def __init__(self, df, filter_index, reference_rollup):
+        self.df = df
+        self.filter_index = filter_index
+        self.reference_rollup = reference_rollup
+
+    @property
+    def date_bounds(self):
+        """Return the earliest and latest start date as datetime.date"""
+        return self.filter_index.date_bounds
+
+    def counts(self, user, status, date_range):
+        """Return the number of matching cases and how many of them are not triaged"""
+        mask = self.filter_index.mask(user, status, date_range)
+        return int(np.count_nonzero(mask)), int(np.count_nonzero(mask & self.filter_index.status_bitmap(NOT_TRIAGED)))
+
+    def rollup(self, user, status, date_range):
+        """Return the SR/Incident rollup of the matching cases"""
+        return self.reference_rollup.summary(self.filter_index.mask(user, status, date_range))
+
+    def cases(self, user, status, date_range, columns, reference=None, offset=0, limit=None):
+        """Return the matching cases newest first, optionally only those linked to one reference.
+
+        Rows are ordered on the integer start day numbers, cases starting on
+        the same day keep their file order, as in CaseDatabase. Only the rows
+        of the requested page are taken from the frame.
+        """
+        mask = self.filter_index.mask(user, status, date_range)
+        if reference is None:
+            positions = np.flatnonzero(mask)
+        else:
+            positions = self.reference_rollup.positions(reference)
+            positions = positions[mask[positions]]
+        days = self.df[DAY_COLUMN].to_numpy()[positions]
+        positions = positions[np.argsort(-days.astype(np.int64), kind='stable')]
+        return self.df[columns].iloc[positions[offset:None if limit is None else offset + limit]]
+
+    def case_cube(self):
+        """Return the case counts per day, user, status group, sub-category and request type"""
+        return CaseCube(self.df)
+
+    def export_batches(self, user, status, date_range):
+        """Yield the matching cases in file order, in batches of rows taken from the frame one at a time"""
+        return frame_batches(self.df, np.flatnonzero(self.filter_index.mask(user, status, date_range)))
+
+    def export_csv(self, user, status, date_range):
+        """Return the matching cases as UTF-8 CSV bytes with a BOM, for Excel"""
+        return export_cases(self.export_batches(user, status, date_range), 'CSV')
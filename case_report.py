@@ -0,0 +1,104 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+from case_categorizer import DIT_TEAM, NOT_TRIAGED, enrich_cases
+from case_loader import DAY_COLUMN, expand_sources, load_case_files, load_case_snapshot
+from case_rollup import ReferenceRollup
+
+# Users grouped under DIT-Team, the same team as the dashboards
+TEAM_USERS = ['anas.hasan', 'ali.babiker', 'mohammed.reda']
+
+# Output formats and their file extensions
+FORMATS = {'csv': '.csv', 'parquet': '.parquet'}
+
+# Label of the cases without a current user in the metrics
+UNASSIGNED = 'Unassigned'
+
+# Columns of the per-user metrics table
+METRIC_COLUMNS = ['User', 'Total Cases', 'Pending SR/Incident', 'Not Triaged']
+
+
+def load_sources(sources, workers=None):
+    """Load and categorize the case exports named by paths, folders or glob patterns.
+
+    A single file is read through its Parquet snapshot, several files are
+    merged with load_case_files. Returns None when nothing could be loaded.
+    """
+    paths = []
+    for source in sources:
+        paths.extend([source] if os.path.isfile(source) else expand_sources(source))
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        return None
+    if len(paths) == 1:
+        return load_case_snapshot(paths[0])
+    return load_case_files(paths, workers=workers)
+
+
+def user_metrics(df, team_users):
+    """Return the total, pending and not triaged case counts per user, with a DIT-Team row first"""
+    not_triaged = df['Status'] == NOT_TRIAGED
+    users = df['Current User Id'].astype(object).replace('', UNASSIGNED)
+    counts = pd.DataFrame({'User': users, 'Not Triaged': not_triaged})
+    per_user = counts.groupby('User', sort=True).agg(**{
+        'Total Cases': ('Not Triaged', 'size'),
+        'Not Triaged': ('Not Triaged', 'sum')
+    }).reset_index()
+    team = per_user[per_user['User'].isin(team_users)]
+    team_row = pd.DataFrame({'User': [DIT_TEAM], 'Total Cases': [team['Total Cases'].sum()],
+                             'Not Triaged': [team['Not Triaged'].sum()]})
+    metrics = pd.concat([team_row, per_user], ignore_index=True)
+    metrics['Pending SR/Incident'] = metrics['Total Cases'] - metrics['Not Triaged']
+    return metrics[METRIC_COLUMNS]
+
+
+def write_table(df, path, output_format):
+    """Write a report table as CSV (UTF-8 with a BOM, for Excel) or Parquet"""
+    if output_format == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Categorize case exports and write the cases, per-user metrics and SR/Incident rollup")
+    parser.add_argument("sources", nargs="+", help="case export CSVs, folders of exports or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="reports", help="folder the report files are written to")
+    parser.add_argument("-f", "--format", choices=sorted(FORMATS), default="csv", help="output file format")
+    parser.add_argument("--team", nargs="*", default=TEAM_USERS, help="users grouped under DIT-Team")
+    parser.add_argument("--workers", type=int, default=None, help="processes used to load several files")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    df = load_sources(args.sources, args.workers)
+    if df is None:
+        print("No case data could be loaded", file=sys.stderr)
+        return 1
+    df = enrich_cases(df, args.team)
+
+    rollup = ReferenceRollup(df).table
+    if args.format == 'csv':
+        rollup = rollup.assign(**{'Case Ids': rollup['Case Ids'].map(lambda ids: ', '.join(map(str, ids)))})
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    extension = FORMATS[args.format]
+    outputs = {
+        'cases': df.drop(columns=DAY_COLUMN, errors='ignore'),
+        'user_metrics': user_metrics(df, args.team),
+        'sr_incident_rollup': rollup
+    }
+    for name, table in outputs.items():
+        write_table(table, os.path.join(args.output_dir, name + extension), args.format)
+
+    not_triaged = int((df['Status'] == NOT_TRIAGED).sum())
+    print(f"{len(df):,} cases, {len(df) - not_triaged:,} pending SR/Incident, {not_triaged:,} not triaged, "
+          f"{len(rollup):,} SR/Incident numbers")
+    print(f"Reports written to {os.path.abspath(args.output_dir)} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+# Columns of the rollup table, in display order
+ROLLUP_COLUMNS = ['SR/Incident Number', 'Number of Cases', 'Assigned To', 'First Case Date', 'Categories', 'Case Ids']
+
+# Sentinel larger than any start date, used while taking per-reference minimums
+_NO_DATE = np.iinfo(np.int64).max
+
+
+class ReferenceRollup:
+    """Rollup of the pending cases per SR/Incident reference number.
+
+    The pending rows are encoded once as integer codes (reference, user,
+    category) plus start date and case id. The full table and any filtered
+    view are aggregated from those codes with bincount and ufunc reductions.
+    It is built once per version of the data, like the filter index.
+    """
+
+    def __init__(self, df):
+        self.size = len(df)
+        self._references, self._users, self._categories = _Codes(), _Codes(), _Codes()
+        pending = (df['SR/Incident Number'].to_numpy(dtype=object) != '')
+        rows = df[pending]
+
+        self._positions = np.flatnonzero(pending)
+        self._reference_codes = self._references.encode(rows['SR/Incident Number'])
+        self._user_codes = self._users.encode(rows['Current User Id'])
+        self._category_codes = self._categories.encode(rows['Sub Category'])
+        self._dates = rows['Case Start Date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        self._case_ids = rows['Case Id'].to_numpy(dtype=object)
+        self.table = self._aggregate(np.arange(len(rows)))
+
+        # Pending rows grouped per reference, in row order, for the detail view of one reference
+        self._reference_order = np.argsort(self._reference_codes, kind='stable')
+        self._reference_bounds = np.concatenate(
+            [[0], np.cumsum(np.bincount(self._reference_codes, minlength=len(self._references)))])
+
+    def positions(self, reference):
+        """Return the row positions of the cases linked to a reference, in row order"""
+        code = self._references.code(reference)
+        if code is None:
+            return np.array([], dtype=np.int64)
+        rows = self._reference_order[self._reference_bounds[code]:self._reference_bounds[code + 1]]
+        return self._positions[rows]
+
+    def summary(self, mask=None):
+        """Return the rollup table, limited to the rows selected by a boolean mask over all rows"""
+        if mask is None:
+            return self.table
+        return self._aggregate(np.flatnonzero(np.asarray(mask)[self._positions]))
+
+    def _aggregate(self, rows):
+        """Aggregate the stored rows at the given indices into one line per reference"""
+        references = self._reference_codes[rows]
+        if not len(rows):
+            return pd.DataFrame({col: [] for col in ROLLUP_COLUMNS}).astype({
+                'Number of Cases': np.int64, 'First Case Date': 'datetime64[ns]'})
+
+        size = len(self._references)
+        counts = np.bincount(references, minlength=size)
+        first_dates = np.full(size, _NO_DATE, dtype=np.int64)
+        np.minimum.at(first_dates, references, self._dates[rows])
+        present = np.flatnonzero(counts)
+
+        # Member case ids grouped by reference, in row order
+        order = np.argsort(references, kind='stable')
+        case_ids = np.split(self._case_ids[rows][order], np.cumsum(counts[present])[:-1])
+
+        table = pd.DataFrame({
+            'SR/Incident Number': self._references.values(present),
+            'Number of Cases': counts[present],
+            'Assigned To': self._join_distinct(references, self._user_codes[rows], self._users, present),
+            'First Case Date': pd.to_datetime(first_dates[present]),
+            'Categories': self._join_distinct(references, self._category_codes[rows], self._categories, present),
+            'Case Ids': [ids.tolist() for ids in case_ids]
+        })
+        return _sort(table)
+
+    @staticmethod
+    def _join_distinct(references, codes, uniques, present):
+        """Join the distinct values of a coded column for each present reference, in sorted order"""
+        # Rank the codes alphabetically, so the distinct (reference, rank) pairs come out grouped and sorted
+        values = uniques.values(np.arange(len(uniques)))
+        order = np.argsort(values, kind='stable')
+        ranks = np.empty(len(uniques), dtype=np.int64)
+        ranks[order] = np.arange(len(uniques))
+        pairs = np.unique(references * len(uniques) + ranks[codes])
+        pair_references, pair_ranks = np.divmod(pairs, len(uniques))
+        counts = np.bincount(pair_references, minlength=present.max() + 1)[present]
+        names = np.split(values[order][pair_ranks], np.cumsum(counts)[:-1])
+        return np.array([', '.join(group) for group in names], dtype=object)
+
+
+class _Codes:
+    """Growing mapping of values to integer codes"""
+
+    def __init__(self):
+        self._codes = {}
+        self._values = []
+
+    def __len__(self):
+        return len(self._values)
+
+    def encode(self, values):
+        """Return the codes of the values, adding codes for values not seen yet"""
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object).fillna(''))
+        for value in uniques:
+            if value not in self._codes:
+                self._codes[value] = len(self._values)
+                self._values.append(value)
+        mapping = np.array([self._codes[value] for value in uniques], dtype=np.int64)
+        return mapping[codes]
+
+    def code(self, value):
+        """Return the code of a value, or None if it was never encoded"""
+        return self._codes.get(value)
+
+    def values(self, codes):
+        """Return the values for an array of codes"""
+        return np.array(self._values, dtype=object)[codes]
+
+
+def _sort(table):
+    """Sort a rollup table by case count, busiest references first"""
+    return table.sort_values(['Number of Cases', 'SR/Incident Number'], ascending=[False, True],
+                             ignore_index=True)
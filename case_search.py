@@ -0,0 +1,108 @@
+import re
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+
+# Word tokens indexed for search, \w covers Arabic letters and digits
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Length of the n-grams indexed over the token vocabulary
+NGRAM_SIZE = 3
+
+
+class CaseSearchIndex:
+    """Inverted index answering substring searches over a few case columns.
+
+    A row matches when the lowercased query is a substring of any one of the
+    indexed columns, the same rule as ``query in str(row[col]).lower()``.
+    The index maps every word token to the rows containing it, and every
+    n-gram of the token vocabulary to the tokens containing it, so a query
+    only checks the rows that hold all of its words.
+    """
+
+    def __init__(self, df, columns):
+        self.columns = [col for col in columns if col in df.columns]
+        self.size = len(df)
+
+        # Lowercased text per column, kept to confirm candidate rows
+        self._texts = {
+            col: np.array([str(value).lower() for value in df[col].to_numpy(dtype=object)], dtype=object)
+            for col in self.columns
+        }
+
+        # Token -> row positions, with the vocabulary sorted for prefix lookups
+        tokens = pd.concat([
+            pd.Series(self._texts[col]).str.findall(TOKEN_PATTERN).explode()
+            for col in self.columns
+        ]).dropna()
+        codes, vocabulary = pd.factorize(tokens.to_numpy(dtype=object), sort=True)
+        order = np.argsort(codes, kind='stable')
+        self._vocabulary = list(vocabulary)
+        self._rows = tokens.index.to_numpy()[order]
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(vocabulary)))])
+
+        # N-gram -> token ids, for substring lookups inside tokens
+        ngrams = {}
+        for token_id, token in enumerate(self._vocabulary):
+            for gram in {token[i:i + NGRAM_SIZE] for i in range(max(len(token) - NGRAM_SIZE + 1, 1))}:
+                ngrams.setdefault(gram, []).append(token_id)
+        self._ngrams = {gram: np.array(ids) for gram, ids in ngrams.items()}
+
+    def search(self, query):
+        """Return the sorted row positions whose columns contain the query"""
+        query = str(query).lower()
+        if not query:
+            return np.arange(self.size)
+
+        words = TOKEN_PATTERN.findall(query)
+        if words:
+            # Every word of the query has to be part of some token of the row
+            candidates = None
+            for word in words:
+                rows = self._rows_with_token_containing(word)
+                candidates = rows if candidates is None else np.intersect1d(candidates, rows, assume_unique=True)
+                if not len(candidates):
+                    return candidates
+        else:
+            candidates = np.arange(self.size)
+
+        # Confirm the full query against each column of the candidate rows
+        matched = np.zeros(len(candidates), dtype=bool)
+        for col in self.columns:
+            texts = self._texts[col][candidates]
+            matched |= np.fromiter((query in text for text in texts), dtype=bool, count=len(texts))
+        return candidates[matched]
+
+    def search_prefix(self, prefix):
+        """Return the sorted row positions holding a token that starts with the prefix"""
+        prefix = str(prefix).lower()
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_left(self._vocabulary, prefix + '\U0010ffff')
+        return self._rows_for_tokens(range(start, end))
+
+    def mask(self, query):
+        """Return a boolean array over all rows, True where the query matches"""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.search(query)] = True
+        return mask
+
+    def _rows_with_token_containing(self, word):
+        """Return the row positions holding a token that contains the word"""
+        if len(word) < NGRAM_SIZE:
+            token_ids = [i for i, token in enumerate(self._vocabulary) if word in token]
+        else:
+            token_ids = None
+            for gram in {word[i:i + NGRAM_SIZE] for i in range(len(word) - NGRAM_SIZE + 1)}:
+                ids = self._ngrams.get(gram)
+                if ids is None:
+                    return np.array([], dtype=int)
+                token_ids = ids if token_ids is None else np.intersect1d(token_ids, ids, assume_unique=True)
+            token_ids = [i for i in token_ids if word in self._vocabulary[i]]
+        return self._rows_for_tokens(token_ids)
+
+    def _rows_for_tokens(self, token_ids):
+        """Return the unique row positions for a set of token ids"""
+        parts = [self._rows[self._offsets[i]:self._offsets[i + 1]] for i in token_ids]
+        if not parts:
+            return np.array([], dtype=int)
+        return np.unique(np.concatenate(parts))
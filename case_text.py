@@ -0,0 +1,84 @@
+import codecs
+import numpy as np
+import pandas as pd
+
+# Code pages a UTF-8 note may have been wrongly decoded with, tried in order when repairing it
+MOJIBAKE_ENCODINGS = ['cp1252', 'latin-1', 'cp1256']
+
+# Encoding error handler mapping characters a code page leaves undefined back to their byte, as latin-1 does
+_BYTE_FALLBACK = 'gpssa-latin1-fallback'
+
+# Column flagging notes whose text was lost before the export was written
+UNRECOVERABLE_COLUMN = 'Note Unrecoverable'
+
+
+def _char_class(chars):
+    """Return a regex character class matching any of ``chars``"""
+    special = set('\\]^-[')
+    return '[' + ''.join('\\' + c if c in special else c for c in sorted(set(chars))) + ']'
+
+
+def _mojibake_pattern(encodings):
+    """Return a regex matching a UTF-8 lead byte followed by a continuation byte, as decoded by any of ``encodings``"""
+    parts = []
+    for encoding in encodings:
+        lead = bytes(range(0xC2, 0xF5)).decode(encoding, errors='ignore')
+        continuation = bytes(range(0x80, 0xC0)).decode(encoding, errors='ignore')
+        parts.append(_char_class(lead) + _char_class(continuation))
+    return '|'.join(parts)
+
+
+# UTF-8 byte pairs read through one of the code pages, the mark of a note that needs repair
+_MOJIBAKE_PATTERN = _mojibake_pattern(MOJIBAKE_ENCODINGS)
+
+# Words made only of question marks, or replacement characters: text the export had already lost
+_LOST_TEXT_PATTERN = '(?:^|\\s)\\?{2,}(?:$|[\\s.,:;])|�'
+
+
+def _latin1_fallback(error):
+    """Encode the characters a code page cannot as their latin-1 byte.
+
+    Windows decoders keep the bytes cp1252 leaves undefined (0x81, 0x8D,
+    0x8F, 0x90, 0x9D) as the C1 control characters of the same value, and
+    0x81 is the second byte of UTF-8 Arabic letters such as ف.
+    """
+    chars = error.object[error.start:error.end]
+    if any(ord(char) > 0xFF for char in chars):
+        raise error
+    return chars.encode('latin-1'), error.end
+
+
+codecs.register_error(_BYTE_FALLBACK, _latin1_fallback)
+
+
+def repair_note(note):
+    """Return one note re-decoded as UTF-8, or unchanged when no code page round-trips it"""
+    for encoding in MOJIBAKE_ENCODINGS:
+        try:
+            return note.encode(encoding, errors=_BYTE_FALLBACK).decode('utf-8')
+        except UnicodeError:
+            continue
+    return note
+
+
+def repair_notes(notes):
+    """Repair the mis-decoded notes of a column and flag the ones that cannot be recovered.
+
+    A vectorized regex finds the notes holding UTF-8 byte pairs read through
+    one of the MOJIBAKE_ENCODINGS, and only the distinct values among them
+    are re-decoded. Clean notes, including correctly decoded Arabic, are
+    left as they are. Notes where Arabic text was already replaced by
+    ``?`` in the export, and candidates no code page round-trips, cannot be
+    repaired. Returns the repaired notes and a boolean Series that is True
+    for those.
+    """
+    notes = notes.astype(str)
+    candidates = notes.str.contains(_MOJIBAKE_PATTERN, regex=True).to_numpy(dtype=bool)
+    failed = np.zeros(len(notes), dtype=bool)
+    if candidates.any():
+        selected = notes[candidates]
+        repaired = {note: repair_note(note) for note in selected.unique()}
+        failed[candidates] = [repaired[note] == note for note in selected]
+        notes = notes.mask(candidates, selected.map(repaired))
+    lost = notes.str.contains(_LOST_TEXT_PATTERN, regex=True).to_numpy(dtype=bool)
+    return notes, pd.Series(lost | failed, index=notes.index)
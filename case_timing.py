@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+# Timings kept per stage for the history and percentiles
+HISTORY_SIZE = 200
+
+# Percentiles shown in the debug panel and written to the metrics file
+PERCENTILES = [50, 90, 99]
+
+# Set GPSSA_TIMING_LOG=1 to log every timing as a JSON line on the gpssa.timing logger
+TIMING_LOG = os.environ.get('GPSSA_TIMING_LOG', '') not in ('', '0')
+
+# Set GPSSA_METRICS_FILE to a path to keep a Prometheus text file of the timings up to date
+METRICS_FILE = os.environ.get('GPSSA_METRICS_FILE')
+
+logger = logging.getLogger('gpssa.timing')
+if TIMING_LOG and not logger.handlers:
+    # Nothing configures logging under streamlit run, so the JSON lines get their own handler on stderr
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def process_memory():
+    """Return the resident memory of this process in bytes, or None where it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class StageTimings:
+    """Recent durations and memory changes of named stages, shared by the whole process.
+
+    Wrap a step in ``with TIMINGS.stage('name'):`` to record it. The last
+    ``history`` runs of every stage are kept for the percentiles, the run
+    count and total time cover the life of the process. Memory changes are
+    the process's resident size before and after the stage, so they are
+    approximate while other sessions or reloads run at the same time.
+    """
+
+    def __init__(self, history=HISTORY_SIZE):
+        self._history = history
+        self._records = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block and record it under ``name``"""
+        memory_before = process_memory()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            memory_after = process_memory()
+            memory_delta = None if memory_before is None or memory_after is None else memory_after - memory_before
+            self.record(name, seconds, memory_delta)
+
+    def record(self, name, seconds, memory_delta=None):
+        """Add one run of a stage"""
+        entry = {'stage': name, 'seconds': seconds, 'memory_delta': memory_delta, 'time': time.time()}
+        with self._lock:
+            self._records.setdefault(name, deque(maxlen=self._history)).append(entry)
+            count, total = self._totals.get(name, (0, 0.0))
+            self._totals[name] = (count + 1, total + seconds)
+        if TIMING_LOG:
+            logger.info(json.dumps(entry))
+
+    def record_once(self, name, seconds, memory_delta=None):
+        """Add a run of a stage that happens once per process, such as startup, unless it is already recorded"""
+        with self._lock:
+            if name in self._records:
+                return
+        self.record(name, seconds, memory_delta)
+
+    def summary(self):
+        """Return one row per stage with the runs, last and percentile times in ms and the last memory change in MB"""
+        columns = ['Stage', 'Runs', 'Last ms'] + [f'p{p} ms' for p in PERCENTILES] + ['Memory MB']
+        rows = []
+        for name, entries in self._snapshot().items():
+            milliseconds = np.array([entry['seconds'] for entry in entries]) * 1000
+            memory_delta = entries[-1]['memory_delta']
+            rows.append([name, self._totals[name][0], milliseconds[-1], *np.percentile(milliseconds, PERCENTILES),
+                         None if memory_delta is None else memory_delta / 1e6])
+        return pd.DataFrame(rows, columns=columns)
+
+    def history(self, stages=None):
+        """Return the recent times in ms, one column per stage, aligned on the latest run"""
+        snapshot = self._snapshot()
+        series = {
+            name: pd.Series([entry['seconds'] * 1000 for entry in entries][::-1])
+            for name, entries in snapshot.items() if stages is None or name in stages
+        }
+        return pd.DataFrame(series).iloc[::-1].reset_index(drop=True)
+
+    def prometheus_text(self):
+        """Return the timings in the Prometheus text exposition format, as a summary per stage"""
+        lines = ['# HELP gpssa_stage_seconds Time spent in each dashboard stage.',
+                 '# TYPE gpssa_stage_seconds summary']
+        for name, entries in self._snapshot().items():
+            seconds = [entry['seconds'] for entry in entries]
+            for p, value in zip(PERCENTILES, np.percentile(seconds, PERCENTILES)):
+                lines.append(f'gpssa_stage_seconds{{stage="{name}",quantile="{p / 100}"}} {value:.6f}')
+            count, total = self._totals[name]
+            lines.append(f'gpssa_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'gpssa_stage_seconds_count{{stage="{name}"}} {count}')
+        memory = process_memory()
+        if memory is not None:
+            lines += ['# HELP gpssa_process_resident_bytes Resident memory of the dashboard process.',
+                      '# TYPE gpssa_process_resident_bytes gauge',
+                      f'gpssa_process_resident_bytes {memory}']
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write the Prometheus text to a file, for a node exporter textfile collector, ignoring failures"""
+        try:
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def publish(self):
+        """Write the metrics file when GPSSA_METRICS_FILE is set"""
+        if METRICS_FILE:
+            self.write_prometheus(METRICS_FILE)
+
+    def _snapshot(self):
+        """Return a copy of the recorded runs per stage"""
+        with self._lock:
+            return {name: list(entries) for name, entries in self._records.items()}
+
+
+def import_profile(modules, cwd=None):
+    """Import modules in a fresh interpreter with -X importtime and return the cumulative seconds per module.
+
+    Returns (total seconds, list of (module, seconds)) for every module the
+    import loaded, slowest first. A deploy can run this to see what the
+    dashboards' cold start is spent on.
+    """
+    code = '; '.join(f'import {module}' for module in modules)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            cwd=cwd, env={**os.environ, 'PYTHONWARNINGS': 'ignore'})
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings.append((name.strip(), int(cumulative) / 1e6, len(name) - len(name.lstrip())))
+    total = sum(seconds for name, seconds, depth in timings if depth == 1 and name in modules)
+    return total, sorted(((name, seconds) for name, seconds, _ in timings), key=lambda item: -item[1])
+
+
+# Timings of this process, recorded by the loader and the dashboards
+TIMINGS = StageTimings()
+
+
+if __name__ == '__main__':
+    # Import-time profile of a dashboard on a cold interpreter: python case_timing.py [module ...] [--top N]
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Report the import time of the dashboard modules")
+    parser.add_argument("modules", nargs="*", default=["DashBord"], help="modules to import")
+    parser.add_argument("--top", type=int, default=20, help="slowest modules listed")
+    args = parser.parse_args()
+
+    total, modules = import_profile(args.modules, cwd=os.path.dirname(os.path.abspath(__file__)))
+    print(f"Import time of {', '.join(args.modules)}: {total * 1000:.0f} ms")
+    for name, seconds in modules[:args.top]:
+        print(f"{seconds * 1000:9.1f} ms  {name}")
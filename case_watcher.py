@@ -0,0 +1,103 @@
+import os
+import threading
+from case_loader import file_content_hash
+
+# Seconds between checks of a watched case export
+POLL_INTERVAL = 10
+
+
+class CaseFileWatcher:
+    """Loaded data of one case export, reloaded in the background when the file changes.
+
+    ``load(path, progress)`` is called once up front and again whenever the
+    file's content hash changes, and returns a tuple whose first item is None
+    when the file could not be read. ``poll`` only stats the file, the hash is
+    computed once the size and mtime moved and then stayed the same for a
+    whole poll, so a file that is still being written is not loaded half
+    done. Reloads run on a worker thread and swap in the new data when they
+    finish, so readers keep getting the previous data meanwhile, and keep it
+    if the reload fails. ``on_replace(old_hash)`` is called after a swap to
+    drop whatever was cached for the previous content.
+    """
+
+    def __init__(self, path, load, on_replace=None, progress=None):
+        self.path = path
+        self.version = 0
+        self.error = None
+        self._load = load
+        self._on_replace = on_replace
+        self._lock = threading.Lock()
+        self._thread = None
+        self._signature = _file_signature(path)
+        self._pending = None
+        self.file_hash = file_content_hash(path)
+        self.data = load(path, progress)
+
+    @property
+    def reloading(self):
+        """Whether a background reload is running"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def snapshot(self):
+        """Return the content hash and data of the latest completed load together"""
+        with self._lock:
+            return self.file_hash, self.data
+
+    def poll(self):
+        """Start a background reload once the file's size or mtime changed and settled, returns whether one runs"""
+        signature = _file_signature(self.path)
+        with self._lock:
+            if self.reloading or signature is None or signature == self._signature:
+                self._pending = None
+                return self.reloading
+            if signature != self._pending:
+                # Changed since the last poll, wait until the writer has finished
+                self._pending = signature
+                return False
+            return self._start(signature, refresh=False)
+
+    def refresh(self):
+        """Hash the file again now, even if its size and mtime look unchanged, and reload it if the content changed"""
+        signature = _file_signature(self.path)
+        with self._lock:
+            if self.reloading or signature is None:
+                return self.reloading
+            return self._start(signature, refresh=True)
+
+    def _start(self, signature, refresh):
+        """Start the reload thread, called with the lock held"""
+        self._signature, self._pending = signature, None
+        self._thread = threading.Thread(target=self._reload, args=(refresh,), name=f"reload {self.path}", daemon=True)
+        self._thread.start()
+        return True
+
+    def _reload(self, refresh):
+        """Reload the file on the worker thread and swap in the result if the content changed"""
+        try:
+            file_hash = file_content_hash(self.path, refresh=refresh)
+            if file_hash == self.file_hash:
+                return
+            data = self._load(self.path, None)
+        except Exception as e:
+            self.error = str(e)
+            return
+        if data is None or data[0] is None:
+            self.error = "the file could not be read"
+            return
+
+        with self._lock:
+            old_hash = self.file_hash
+            self.file_hash, self.data = file_hash, data
+            self.version += 1
+            self.error = None
+        if self._on_replace:
+            self._on_replace(old_hash)
+
+
+def _file_signature(path):
+    """Return the (size, mtime) of a file, or None if it cannot be read"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
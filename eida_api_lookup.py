@@ -1,38 +1,121 @@
-import requests
+import pandas as pd
 import streamlit as st
+from eida_cache import APP_CACHE_FILE, EidaResponseCache
+from eida_client import (DEFAULT_CONCURRENCY, DEFAULT_RETRIES, DEFAULT_TIMEOUT, EIDA_API_URL, bulk_lookup,
+                         create_session, eids_from_cases, flatten_result, is_valid_eid, lookup_eid,
+                         normalize_eid)
+
+# Number of completed lookups between refreshes of the bulk results table
+REFRESH_EVERY = 25
+
+
+@st.cache_resource
+def get_session(concurrency, retries):
+    """Pooled session shared by the lookups of this process"""
+    return create_session(concurrency, retries)
+
+
+@st.cache_resource
+def get_response_cache():
+    """Response cache shared by the lookups of this process, persisted across restarts only when configured"""
+    return EidaResponseCache(path=APP_CACHE_FILE)
+
 
 st.title("EIDA Personal Info Lookup")
 
-eid = st.text_input("Enter Emirates ID (15 digits):")
+st.sidebar.header("Connection")
+base_url = st.sidebar.text_input("EIDA API URL", value=EIDA_API_URL)
+concurrency = st.sidebar.slider("Concurrent requests", min_value=1, max_value=32, value=DEFAULT_CONCURRENCY)
+timeout = st.sidebar.number_input("Timeout (seconds)", min_value=1, max_value=120, value=DEFAULT_TIMEOUT)
+retries = st.sidebar.number_input("Retries", min_value=0, max_value=10, value=DEFAULT_RETRIES)
+
+response_cache = get_response_cache()
+
+single_tab, bulk_tab = st.tabs(["Single lookup", "Bulk lookup"])
 
-if st.button("Lookup"):
-    if eid and len(eid) == 15 and eid.isdigit():
-        url = f"http://172.23.12.77:7575/api/gsb/eida/get-personal-info/{eid}"
-        headers = {
-            "username": "user1",
-            "password": "password123",
-            # Optional: Add content-type if needed
-            # "Content-Type": "application/json"
-        }
+with single_tab:
+    eid = st.text_input("Enter Emirates ID (15 digits):")
 
-        try:
+    if st.button("Lookup"):
+        if eid and is_valid_eid(eid):
             with st.spinner("Contacting EIDA API..."):
-                response = requests.get(url, headers=headers, timeout=10)
+                result = lookup_eid(get_session(concurrency, retries), eid, timeout, base_url, response_cache)
+            response_cache.save()
 
-            if response.status_code == 200:
+            if result["status"] == "found":
                 st.success("Data Retrieved Successfully ✅")
-                st.json(response.json())
-            elif response.status_code == 401:
+                st.json(result["data"])
+            elif result["status"] == "unauthorized":
                 st.error("Unauthorized: Check your credentials ❌")
-            elif response.status_code == 404:
+            elif result["status"] == "not_found":
                 st.warning("No data found for the provided Emirates ID.")
+            elif result["status"] == "timeout":
+                st.error("⏱ Connection timed out. The API server is reachable, but the service may not be running.")
+            elif result["status"] == "connection_error":
+                st.error("❌ Failed to connect. Service might be down or port 7575 is blocked.")
+            elif result["status_code"] is not None:
+                st.error(f"Unexpected error: {result['status_code']}")
             else:
-                st.error(f"Unexpected error: {response.status_code}")
-        except requests.exceptions.ConnectTimeout:
-            st.error("⏱ Connection timed out. The API server is reachable, but the service may not be running.")
-        except requests.exceptions.ConnectionError:
-            st.error("❌ Failed to connect. Service might be down or port 7575 is blocked.")
-        except Exception as e:
-            st.error(f"An error occurred: {str(e)}")
+                st.error(f"An error occurred: {result['error']}")
+        else:
+            st.warning("Please enter a valid 15-digit Emirates ID.")
+
+with bulk_tab:
+    cases = None
+    case_file = st.file_uploader("Upload a case CSV with an 'Emirates ID' column", type=["csv"])
+    if case_file is not None:
+        cases = pd.read_csv(case_file, dtype={"Emirates ID": str})
+        ids = eids_from_cases(cases)
     else:
-        st.warning("Please enter a valid 15-digit Emirates ID.")
+        pasted = st.text_area("Or paste Emirates IDs, one per line:")
+        ids = list(dict.fromkeys(filter(None, (normalize_eid(line) for line in pasted.splitlines()))))
+
+    st.caption(f"{len(ids):,} distinct valid Emirates IDs")
+
+    if st.button("Run bulk lookup", disabled=not ids):
+        progress = st.progress(0, text="Looking up Emirates IDs...")
+        table = st.empty()
+        rows = []
+
+        # Results arrive in completion order and are shown as they come in
+        for result in bulk_lookup(ids, concurrency, timeout, retries, base_url=base_url,
+                                  session=get_session(concurrency, retries), cache=response_cache):
+            rows.append(flatten_result(result))
+            if len(rows) % REFRESH_EVERY == 0 or len(rows) == len(ids):
+                progress.progress(len(rows) / len(ids), text=f"Looked up {len(rows):,} of {len(ids):,}")
+                table.dataframe(pd.DataFrame(rows), use_container_width=True)
+        progress.empty()
+        response_cache.save()
+
+        results = pd.DataFrame(rows)
+        st.session_state["eida_bulk_results"] = results
+        counts = results["Lookup Status"].value_counts()
+        st.success(", ".join(f"{status}: {count:,}" for status, count in counts.items()))
+
+    results = st.session_state.get("eida_bulk_results")
+    if results is not None:
+        if cases is not None:
+            # Attach the looked up details to every case row of the uploaded table
+            details = results.drop(columns="Emirates ID").set_axis(results["Emirates ID"])
+            key = cases["Emirates ID"].map(normalize_eid)
+            output = pd.concat([cases, details.reindex(key).set_axis(cases.index)], axis=1)
+        else:
+            output = results
+        st.subheader("Results")
+        st.dataframe(output, use_container_width=True)
+        st.download_button(
+            label="Download Results",
+            data=output.to_csv(index=False).encode("utf-8-sig"),
+            file_name="eida_lookup_results.csv",
+            mime="text/csv"
+        )
+
+# Response cache counters, rendered last so they include this run's lookups
+stats = response_cache.stats()
+st.sidebar.header("Response Cache")
+st.sidebar.write(f"Entries: {stats['entries']:,}")
+st.sidebar.write(f"Hits: {stats['hits']:,} / Misses: {stats['misses']:,} ({stats['hit_rate']:.0%} hit rate)")
+if st.sidebar.button("Clear Cache"):
+    response_cache.clear()
+    response_cache.save()
+    st.rerun()
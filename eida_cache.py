@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Folder for the local caches, the same one the case loader uses
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'gpssa')
+
+# File the command line's --cache persists the EIDA responses to between restarts
+RESPONSE_CACHE_FILE = os.path.join(CACHE_DIR, 'eida_responses.json')
+
+# Set GPSSA_EIDA_CACHE_FILE to a path to persist the app's responses, by default they are only kept in memory
+# since they hold personal data
+APP_CACHE_FILE = os.environ.get('GPSSA_EIDA_CACHE_FILE') or None
+
+# Defaults for the response cache
+DEFAULT_MAX_SIZE = 10000
+DEFAULT_HIT_TTL = 24 * 60 * 60
+DEFAULT_NOT_FOUND_TTL = 60 * 60
+
+# Lookup statuses worth caching, everything else is retried on the next lookup
+CACHED_STATUSES = ('found', 'not_found')
+
+
+class EidaResponseCache:
+    """LRU cache of EIDA lookup results keyed by Emirates ID.
+
+    Found and not found results expire after separate TTLs, the least
+    recently used entry is evicted once ``max_size`` is reached, and errors
+    are never cached. With a ``path`` the entries are loaded on creation and
+    written back by ``save``, so they survive restarts. Access is locked, as
+    bulk lookups use the cache from several threads.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, hit_ttl=DEFAULT_HIT_TTL, not_found_ttl=DEFAULT_NOT_FOUND_TTL,
+                 path=None):
+        self.max_size = max_size
+        self.ttls = {'found': hit_ttl, 'not_found': not_found_ttl}
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, eid):
+        """Return the cached result for an Emirates ID, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(eid)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[eid]
+                self._dirty = True
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(eid)
+            self.hits += 1
+            return dict(entry[1], cached=True)
+
+    def put(self, result):
+        """Store a lookup result if its status is cacheable"""
+        status = result.get('status')
+        if status not in CACHED_STATUSES or self.ttls[status] <= 0:
+            return
+        entry = {key: value for key, value in result.items() if key != 'cached'}
+        with self._lock:
+            self._entries[result['eid']] = (time.time() + self.ttls[status], entry)
+            self._entries.move_to_end(result['eid'])
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty = True
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+            self._dirty = True
+
+    def stats(self):
+        """Return the entry count and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def save(self):
+        """Write the unexpired entries to ``path``, ignoring unwritable locations"""
+        if not self.path or not self._dirty:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [[eid, expires, entry] for eid, (expires, entry) in self._entries.items() if expires > now]
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def _load(self):
+        """Read the unexpired entries persisted at ``path``, oldest used first"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for eid, expires, entry in entries[-self.max_size:]:
+            if expires > now:
+                self._entries[eid] = (expires, entry)
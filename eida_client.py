@@ -0,0 +1,205 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Base URL of the EIDA personal info service, overridable for a local stand-in server
+EIDA_API_URL = os.environ.get("EIDA_API_URL", "http://172.23.12.77:7575/api/gsb/eida/get-personal-info")
+
+# Credentials expected by the EIDA service
+EIDA_HEADERS = {
+    "username": "user1",
+    "password": "password123",
+}
+
+# Defaults for bulk lookups
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+
+# Emirates IDs are 15 digits
+_EID_PATTERN = re.compile(r'^\d{15}$')
+
+
+def is_valid_eid(eid):
+    """Check an Emirates ID is a 15-digit string"""
+    return bool(_EID_PATTERN.match(str(eid)))
+
+
+def normalize_eid(value):
+    """Return a value from a case export as a 15-digit Emirates ID, or None.
+
+    Handles IDs written with dashes or read by pandas as floats (784....0).
+    """
+    if value is None or value != value:
+        return None
+    text = str(value).strip()
+    if text.endswith('.0'):
+        text = text[:-2]
+    text = text.replace('-', '').replace(' ', '')
+    return text if is_valid_eid(text) else None
+
+
+def create_session(concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """Create a pooled HTTP session that retries connection errors and 429/5xx responses with backoff"""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(EIDA_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def lookup_eid(session, eid, timeout=DEFAULT_TIMEOUT, base_url=None, cache=None):
+    """Look up one Emirates ID and return a result dict.
+
+    The result always has ``eid``, ``status`` (found, not_found,
+    unauthorized, error, timeout or connection_error), ``status_code``,
+    ``data`` and ``error``, so callers never have to catch request errors.
+    With a ``cache`` (an EidaResponseCache) a cached result is returned
+    without a request, and new found/not found results are stored.
+    """
+    if cache is not None:
+        cached = cache.get(eid)
+        if cached is not None:
+            return cached
+    result = _request_eid(session, eid, timeout, base_url)
+    if cache is not None:
+        cache.put(result)
+    return result
+
+
+def _request_eid(session, eid, timeout, base_url):
+    """Send the request for one Emirates ID and turn the response into a result dict"""
+    result = {"eid": eid, "status": "error", "status_code": None, "data": None, "error": None}
+    url = f"{(base_url or EIDA_API_URL).rstrip('/')}/{eid}"
+    try:
+        response = session.get(url, timeout=timeout)
+    except requests.exceptions.ConnectTimeout:
+        result.update(status="timeout", error="Connection timed out")
+        return result
+    except requests.exceptions.ConnectionError as e:
+        result.update(status="connection_error", error=str(e))
+        return result
+    except requests.exceptions.RequestException as e:
+        result.update(error=str(e))
+        return result
+
+    result["status_code"] = response.status_code
+    if response.status_code == 200:
+        try:
+            result.update(status="found", data=response.json())
+        except ValueError:
+            result.update(error="Invalid JSON in response")
+    elif response.status_code == 404:
+        result["status"] = "not_found"
+    elif response.status_code == 401:
+        result.update(status="unauthorized", error="Unauthorized")
+    else:
+        result["error"] = f"Unexpected status {response.status_code}"
+    return result
+
+
+def bulk_lookup(eids, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                backoff=DEFAULT_BACKOFF, base_url=None, session=None, cache=None):
+    """Look up many Emirates IDs concurrently, yielding result dicts as they complete.
+
+    Duplicate and invalid IDs are dropped before any request is made. IDs
+    found in ``cache`` are yielded first without a request. A pooled session
+    is created unless one is passed in.
+    """
+    unique_eids = list(dict.fromkeys(eid for eid in eids if is_valid_eid(eid)))
+    if cache is not None:
+        missing = []
+        for eid in unique_eids:
+            cached = cache.get(eid)
+            if cached is None:
+                missing.append(eid)
+            else:
+                yield cached
+        unique_eids = missing
+    if not unique_eids:
+        return
+
+    owns_session = session is None
+    if owns_session:
+        session = create_session(concurrency, retries, backoff)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(lookup_eid, session, eid, timeout, base_url) for eid in unique_eids]
+            for future in as_completed(futures):
+                result = future.result()
+                if cache is not None:
+                    cache.put(result)
+                yield result
+    finally:
+        if owns_session:
+            session.close()
+
+
+def eids_from_cases(df, column="Emirates ID"):
+    """Return the distinct valid Emirates IDs found in a case table column"""
+    if column not in df.columns:
+        return []
+    eids = (normalize_eid(value) for value in df[column].to_numpy(dtype=object))
+    return list(dict.fromkeys(eid for eid in eids if eid))
+
+
+def flatten_result(result):
+    """Turn a lookup result into a flat row for a results table"""
+    row = {"Emirates ID": result["eid"], "Lookup Status": result["status"], "Lookup Error": result["error"],
+           "Cached": result.get("cached", False)}
+    if isinstance(result["data"], dict):
+        for key, value in result["data"].items():
+            row[f"EIDA {key}"] = value if not isinstance(value, (dict, list)) else str(value)
+    return row
+
+
+if __name__ == "__main__":
+    # Bulk lookup from the command line: python eida_client.py <ids.txt | cases.csv> [--base-url URL]
+    import argparse
+    import json
+    import sys
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Look up Emirates IDs in bulk against the EIDA service")
+    parser.add_argument("source", help="text file with one Emirates ID per line, or a case CSV with an 'Emirates ID' column")
+    parser.add_argument("--base-url", default=None, help="EIDA service base URL")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument("--cache", action="store_true", help="reuse and persist cached responses")
+    args = parser.parse_args()
+
+    if args.source.lower().endswith(".csv"):
+        ids = eids_from_cases(pd.read_csv(args.source, dtype={"Emirates ID": str}))
+    else:
+        with open(args.source, encoding="utf-8") as f:
+            ids = [normalize_eid(line) for line in f]
+
+    cache = None
+    if args.cache:
+        from eida_cache import RESPONSE_CACHE_FILE, EidaResponseCache
+        cache = EidaResponseCache(path=RESPONSE_CACHE_FILE)
+
+    for result in bulk_lookup(ids, args.concurrency, args.timeout, args.retries, base_url=args.base_url,
+                              cache=cache):
+        sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    if cache is not None:
+        cache.save()
+        sys.stderr.write(json.dumps(cache.stats()) + "\n")
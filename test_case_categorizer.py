@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from case_categorizer import NOT_TRIAGED, categorize_case, categorize_notes
+
+# Notes matching none of the patterns
+UNMATCHED_NOTES = [
+    'This is an enquiry not technical issue',
+    'As per the meeting held yesterday the issue remains unresolved.',
+    'Follow up on 12345 please',
+    'sr 1234 raised',
+    'incident 123 logged',
+    'call back on 1512',
+    'المشكلة مستمرة ولم يتم حلها',
+    '',
+    '   ',
+    None,
+    np.nan
+]
+
+# Notes matching one pattern
+MATCHED_NOTES = [
+    'Raised SR 14567 for the portal issue',
+    'sr#15001 pending with the vendor',
+    'SERVICE REQUEST: 1499',
+    'Incident 9876 created, waiting for the fix',
+    'inc: 21345 assigned to DIT',
+    'Tkt_21905 escalated',
+    'ticket 30001 under review',
+    'pending on 14321',
+    'vendor fix for 22987',
+    'تم رفع طلب خدمة 15432 للفريق المختص',
+    'تم فتح انسدنت 2345',
+    'تيكت 40404'
+]
+
+# Notes matching several patterns, the earlier pattern or the earlier match wins
+OVERLAPPING_NOTES = [
+    'inc 21234 and sr 14567',
+    'ticket 21999 also 15123',
+    'sr 12345 then inc 22222',
+    'sr 12345 then sr 14001',
+    'incident 5555 linked to 14222',
+    'tkt 40404 for 21555',
+    '21555 and 14999',
+    'طلب خدمة 12000 و انسدنت 3333'
+]
+
+
+@pytest.mark.parametrize('notes', [UNMATCHED_NOTES, MATCHED_NOTES, OVERLAPPING_NOTES],
+                         ids=['unmatched', 'matched', 'overlapping'])
+def test_categorize_notes_matches_categorize_case(notes):
+    series = pd.Series(notes, dtype=object)
+    assert categorize_notes(series)['Status'].tolist() == [categorize_case(note) for note in series]
+
+
+def test_unmatched_notes_are_not_triaged():
+    statuses = categorize_notes(pd.Series(UNMATCHED_NOTES, dtype=object))
+    assert (statuses['Status'] == NOT_TRIAGED).all()
+    assert (statuses['SR/Incident Number'] == '').all()
+
+
+def test_earlier_pattern_wins():
+    statuses = categorize_notes(pd.Series(OVERLAPPING_NOTES[:4], dtype=object))['Status']
+    assert statuses.tolist() == ['Pending SR 14567', 'Pending SR 15123', 'Pending Incident 22222', 'Pending SR 14001']
+
+
+def test_keeps_index_of_notes():
+    notes = pd.Series(MATCHED_NOTES[:3], index=[10, 5, 7], dtype=object)
+    categorized = categorize_notes(notes)
+    assert categorized.index.tolist() == [10, 5, 7]
+    assert categorized['SR/Incident Number'].tolist() == ['14567', '15001', '1499']